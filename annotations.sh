@@ -1,6 +1,6 @@
 #!/bin/bash
 
-## SCRIPT TO CREATE LISTS OF ENTITIES WITHIN ENTITIES LIST (EXCEPT MANUAL LISTS)
+## SCRIPT TO CREATE LISTS OF ENTITIES WITHIN ENTITIES LIST (EXCEPT MANUAL LISTS) AND THE ANNOTATION LISTS
 
 # activate env
 source env/bin/activate
@@ -8,24 +8,9 @@ source env/bin/activate
 # define scripts dir 
 SCRIPTS_DIR="src/annotations"
 
-# scripts to run
-SCRIPTS=(
-    "money.py"
-    "percent.py"
-    #"date.py"
-    "person.py"
-    "quantity.py"
-)
-
-# run scripts
-echo "[INFO:] Running all scripts within $SCRIPTS_DIR"
-for script in "${SCRIPTS[@]}"; do
-    python "$SCRIPTS_DIR/$script"
-done
-
-# exectute the generate annotations script
-echo "[INFO:] Creating the anotation lists ..."
-python "$SCRIPTS_DIR/create_annotations.py"
+# generate the coded entity lists (in parallel) and create the annotation lists in one process
+echo "[INFO:] Building the entity lists and the annotation lists ..."
+python "$SCRIPTS_DIR/build_lists.py" --excel --txt
 
 # deactivate env
-deactivate
\ No newline at end of file
+deactivate
@@ -9,6 +9,7 @@ import numpy as np
 
 sys.path.append(str(pathlib.Path(__file__).parents[1]))
 from external_data.fetch_data import fetch_dansk, fix_dane, fetch_dane
+from records import read_labelled
 
 
 def annotation_errors(annotations_path, outpath):
@@ -38,11 +39,11 @@ def get_SYNEDA_sentence_lens(annotations_path):
     # create nlp object
     nlp = spacy.blank("da")
 
-    # load syneda
-    syneda = pd.read_csv(annotations_path / "annotations_w_generations_spanned.csv")
+    # load syneda (records from prepare_data.py)
+    syneda = read_labelled(annotations_path / "annotations_w_generations_spanned.jsonl")
 
-    # get text column into a list
-    text = syneda["text"].tolist()
+    # get text of every record into a list
+    text = [record["text"] for record in syneda]
 
     # for each element, calculate word count with spacy
     sentence_lengths = [len(nlp(text[i])) for i in range(len(text))]
@@ -0,0 +1,120 @@
+'''
+Build all coded entity lists and the annotation lists in one process (instead of one script per list, see annotations.sh).
+
+MANUAL_LISTS.xlsx is loaded once and shared with the generators, which run in parallel processes. The generated lists are saved as csv
+(as the separate scripts do) and handed directly to the annotation list step. A timing report is printed at the end.
+'''
+import argparse
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from utils import load_manual_lists
+from entity_store import load_sheets
+from numeric import NUMERIC_SPECS, generate_numeric, entities_to_df
+from date import create_date_df
+from person import create_person_df
+from create_annotations import add_arguments, create_annotation_lists
+
+def generate_list(ent_type, ents_path, sheets, seed=1209):
+    '''
+    Generate one coded entity list, seeded as when its script is run on its own.
+
+    Returns
+        df: df with entity, weight and context columns (None if an input of the generator is missing, so the existing list is used)
+        seconds: time spent generating the list
+    '''
+    start = time.perf_counter()
+    np.random.seed(seed)
+
+    if ent_type not in NUMERIC_SPECS and ent_type not in ["DATE", "PERSON"]:
+        raise ValueError(f"No generator for {ent_type}")
+
+    try:
+        if ent_type in NUMERIC_SPECS:
+            df = entities_to_df(generate_numeric(NUMERIC_SPECS[ent_type], ents_path, sheets=sheets))
+        elif ent_type == "DATE":
+            df = create_date_df()
+        else:
+            df = create_person_df(ents_path / "person_names", sheets["PERSON"])
+    except FileNotFoundError as error:
+        # e.g., the name lists of PERSON are not in the repo
+        print(f"[WARNING:] Could not generate {ent_type} ({error.filename} not found). Using the existing {ent_type}.csv instead.")
+        df = None
+
+    return df, time.perf_counter() - start
+
+def generate_lists(ent_types, ents_path, sheets, n_workers):
+    '''
+    Generate coded entity lists in a process pool (or in this process if n_workers is 1).
+
+    Returns
+        coded: dict with entity type as key and df as value (for the lists that were generated)
+        timings: dict with entity type as key and seconds as value
+    '''
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = {ent_type: executor.submit(generate_list, ent_type, ents_path, sheets) for ent_type in ent_types}
+            results = {ent_type: future.result() for ent_type, future in futures.items()}
+    else:
+        results = {ent_type: generate_list(ent_type, ents_path, sheets) for ent_type in ent_types}
+
+    # lists that could not be generated are left out (and read from their csv)
+    coded = {ent_type: df for ent_type, (df, _) in results.items() if df is not None}
+    timings = {ent_type: seconds for ent_type, (_, seconds) in results.items()}
+
+    return coded, timings
+
+def input_parse():
+    '''
+    Parse command line arguments (the arguments of create_annotations.py are passed on to the annotation list step).
+    '''
+    parser = argparse.ArgumentParser(description="Build the coded entity lists and the annotation lists.")
+    parser.add_argument("--generators", nargs="+", default=["MONEY", "QUANTITY", "PERCENT", "DATE", "PERSON"], help="coded entity lists to generate (the others are read from their csv)")
+    parser.add_argument("--generator_workers", type=int, default=5, help="number of processes to generate the entity lists with")
+    add_arguments(parser)
+
+    return parser.parse_args()
+
+def main():
+    args = input_parse()
+
+    # define paths
+    path = pathlib.Path(__file__)
+    ents_path = path.parents[2] / "dbase" / "entities_lists"
+    outpath = path.parents[2] / "dbase" / "annotations"
+
+    timings = {}
+
+    # load the manual lists once (from the entity store if given)
+    start = time.perf_counter()
+    sheets = load_sheets(args.store) if args.store is not None else load_manual_lists(ents_path)
+    timings["load manual lists"] = time.perf_counter() - start
+
+    # generate the coded lists in parallel
+    start = time.perf_counter()
+    coded, generator_timings = generate_lists(args.generators, ents_path, sheets, n_workers=min(args.generator_workers, len(args.generators)))
+    timings.update({f"generate {ent_type}": seconds for ent_type, seconds in generator_timings.items()})
+    timings["generators (wall time)"] = time.perf_counter() - start
+
+    # save the coded lists (so that the entity lists on disk match the annotation lists)
+    start = time.perf_counter()
+    for ent_type, df in coded.items():
+        df.to_csv(ents_path / f"{ent_type}.csv", index=False)
+    timings["save coded lists"] = time.perf_counter() - start
+
+    # create the annotation lists from the lists in memory
+    start = time.perf_counter()
+    # (with an entity store, the sheets are read from the store again, so that they are hashed as the lists in the store)
+    create_annotation_lists(args, ents_path, outpath, sheets=None if args.store is not None else sheets, coded=coded)
+    timings["annotation lists"] = time.perf_counter() - start
+
+    # print timing report
+    report = pd.DataFrame({"step": list(timings), "seconds": [round(seconds, 3) for seconds in timings.values()]})
+    print("\n--------- TIMING REPORT --------- \n")
+    print(report.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
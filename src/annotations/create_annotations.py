@@ -1,56 +1,71 @@
+import argparse
 import pathlib
 import pandas as pd
 import numpy as np
 import random
+from concurrent.futures import ProcessPoolExecutor
 
-def load_data(data_path):
+from utils import load_manual_lists
+from entity_store import load_sheets, load_coded, CODED_TYPES
+from sampling import AliasSampler
+from writers import AnnotationWriter, df_to_records, export_excel, export_txt, read_manifest, read_records
+from incremental import source_hashes, store_hashes, read_sources_manifest, write_sources_manifest, changed_sources, regenerate_examples, generation_report
+
+# manual entities (sheets of MANUAL_LISTS.xlsx), the coded entities are entity_store.CODED_TYPES
+MANUAL_TYPES = ["EVENT", "FACILITY", "GPE", "LANGUAGE", "LAW", "LOCATION", "NORP", "ORDINAL", "ORGANIZATION", "PRODUCT", "TIME", "WORK OF ART", "CARDINAL"]
+
+def load_data(data_path, sheets=None, coded=None):
     '''
     Load data for all entities.
 
     Args
         data_path: path to data folder with coded and manual entities
+        sheets: dict with already loaded sheets of MANUAL_LISTS.xlsx (sheets that are missing are loaded from data_path)
+        coded: dict with already generated coded entities as dfs, e.g. {"MONEY": df} (types that are missing are read from their csv)
 
     Returns
-        df_all: df with all entities
+        df_all: df with all entities (with a source column naming the list each entity comes from, e.g. "MONEY.csv" or "MANUAL_LISTS.xlsx:GPE")
         multiple: df with all multiples (special dataframe containing more information about multiples)
     '''
 
     # complete entities
-    coded_entity_types = ["DATE", "MONEY", "PERCENT", "QUANTITY", "PERSON"]
+    coded_entity_types = CODED_TYPES
 
     # manual entities
-    manual_entity_types = ["EVENT", "FACILITY", "GPE", "LANGUAGE", "LAW", "LOCATION", "NORP", "ORDINAL", "ORGANIZATION", "PRODUCT", "TIME", "WORK OF ART", "CARDINAL"]
+    manual_entity_types = MANUAL_TYPES
+
+    # load all sheets of the manual lists in one pass (unless they are already loaded)
+    sheets = dict(sheets or {})
+    missing_sheets = [name for name in manual_entity_types + ["MULTIPLE"] if name not in sheets]
+
+    if missing_sheets:
+        sheets.update(load_manual_lists(data_path, sheet_names=missing_sheets))
+
+    coded = coded or {}
+
+    # add type to entities that are manual (not coded)
+    dfs = [sheets[ent_type].assign(TYPE=ent_type, source=f"MANUAL_LISTS.xlsx:{ent_type}") for ent_type in manual_entity_types]
 
-    # initialize df for all entities
-    df_all = pd.DataFrame()
-    
-    # load data for entities that are manual (not coded)
-    for ent_type in manual_entity_types:
-        df = pd.read_excel(data_path / "MANUAL_LISTS.xlsx", sheet_name=ent_type)
-        df["TYPE"] = ent_type
-        df_all = pd.concat([df_all, df], ignore_index=True)
-    
     # load data for entities that are coded
-    for ent_type in coded_entity_types:
-        df = pd.read_csv(data_path / f"{ent_type}.csv")
-        df["TYPE"] = ent_type
-        df_all = pd.concat([df_all, df], ignore_index=True)
+    dfs += [(coded[ent_type] if ent_type in coded else pd.read_csv(data_path / f"{ent_type}.csv")).assign(TYPE=ent_type, source=f"{ent_type}.csv") for ent_type in coded_entity_types]
 
     # load multiples
-    multiple = pd.read_excel(data_path / "MANUAL_LISTS.xlsx", sheet_name="MULTIPLE")
+    multiple = sheets["MULTIPLE"].copy()
     multiple["TYPE"] = "MULTIPLE"
-    
-    # add multiples to df_all but only the entity col 
-    df_all = pd.concat([df_all, multiple[["entity", "weight", "context", "TYPE"]]], ignore_index=True)
+    multiple["source"] = "MANUAL_LISTS.xlsx:MULTIPLE"
+
+    # combine all entities and add multiples but only the entity col 
+    df_all = pd.concat(dfs + [multiple[["entity", "weight", "context", "TYPE", "source"]]], ignore_index=True)
 
     return df_all, multiple
 
-def update_weights(df_all):
+def update_weights(df_all, rng=np.random):
     '''
     Double weights at a 50% probability for those weights that are 1.
 
     Args
         df_all: df with all entities
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
 
     Returns
         df_all: df with all entities but some of them have updated weights
@@ -59,32 +74,47 @@ def update_weights(df_all):
     indices = df_all[df_all["weight"] == 1].index
 
     # sample indices
-    indices = np.random.choice(indices, size=int(len(indices)/2), replace=False)
+    indices = rng.choice(indices, size=int(len(indices)/2), replace=False)
 
     # update weights
     df_all.loc[indices, "weight"] = 2
 
     return df_all
 
-def expand_data(df_all):
+def expand_data(df_all, size=None, rng=np.random):
     '''
-    Expands data by multiplying rows by the weight of each entity.
+    Expands data by drawing entities in proportion to their weight.
+
+    By default, every row is repeated by its weight and the rows are shuffled. With a size, an alias sampler over the distinct entities
+    is used instead, so the entities do not have to be repeated by their weight.
+
+    Args
+        df_all: df with all entities and their weight
+        size: number of entities to draw with replacement (defaults to None i.e., every weighted copy of every entity exactly once)
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+
+    Returns
+        df_all: df with a row for every drawn entity (and without the weight column)
     '''
-    # multiply rows by weight
-    df_all = df_all.loc[df_all.index.repeat(df_all["weight"])].reset_index(drop=True)
+    # draw positions of entities
+    if size is None:
+        indices = rng.permutation(np.repeat(np.arange(len(df_all)), df_all["weight"].to_numpy()))
+    else:
+        indices = AliasSampler(df_all["weight"]).sample(size, rng=rng)
 
     # drop weights
     df_all = df_all.drop(columns=["weight"])
 
-    return df_all
+    return df_all.iloc[indices].reset_index(drop=True)
 
-def generate_posessives(df_all, threshold=0.2):
+def generate_posessives(df_all, threshold=0.2, rng=np.random):
     '''
     Alter some entities to have possessives for types where appropriate.
 
     Args
         df_all: df with all entities
         threshold: threshold for how many entities to alter
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
 
     Returns
         df_all: df with all entities but some of them altered to be posessives
@@ -96,161 +126,443 @@ def generate_posessives(df_all, threshold=0.2):
     indices = df_all[(df_all["TYPE"].isin(posessive_types)) & (~df_all["entity"].str.endswith("s"))].index
 
     # sample indices
-    indices = np.random.choice(indices, size=int(len(indices)*threshold), replace=False)
+    indices = rng.choice(indices, size=int(len(indices)*threshold), replace=False)
 
     # update entities
     df_all.loc[indices, "entity"] = df_all.loc[indices, "entity"] + "s"
     
     return df_all
 
-def sample_number():
+def sample_number(size=None, rng=np.random):
+    '''
+    Sample the number of entities in an example.
+
+    Args
+        size: number of draws (defaults to None i.e., a single number)
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+
+    Returns
+        number of entities (or array of numbers if size is given)
+    '''
     # Define the probabilities for each number
     probabilities = np.array([0.5, 0.3, 0.15, 0.05])
     numbers = np.array([1, 2, 3, 4])
 
-    # Use np.random.choice to sample based on the specified probabilities
-    return np.random.choice(numbers, p=probabilities)
+    # Use choice to sample based on the specified probabilities
+    return rng.choice(numbers, size=size, p=probabilities)
+
+def partition_sizes(n_rows, rng=np.random):
+    '''
+    Draw the number of entities for all examples at once so that they add up to exactly n_rows.
+
+    Args
+        n_rows: number of entities to partition into examples
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+
+    Returns
+        sizes: array with the number of entities in each example
+    '''
+    if n_rows == 0:
+        return np.array([], dtype=int)
+
+    # every example has at least one entity, so n_rows draws are always enough
+    sizes = sample_number(size=n_rows, rng=rng)
+
+    # find the example where the cumulative number of entities reaches n_rows
+    ends = np.cumsum(sizes)
+    n_examples = np.searchsorted(ends, n_rows) + 1
 
-def shuffle_df(df):
+    # keep only the examples needed and shorten the last one if we overshoot (as when only few entities are left)
+    sizes = sizes[:n_examples]
+    sizes[-1] -= ends[n_examples - 1] - n_rows
+
+    return sizes
+
+def shuffle_df(df, rng=np.random):
     '''
     Shuffle a df, but ensure that two of the same "MULTIPLE" type are not next to each other.
+
+    The non-MULTIPLE rows are shuffled and the MULTIPLE rows are then placed in distinct gaps between them (including both ends).
+    This gives every valid order the same probability and runs in O(n) instead of reshuffling until the constraint happens to hold.
+
+    Args
+        df: df with a TYPE column
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+
+    Returns
+        df: shuffled df with a fresh index
+
+    Raises
+        ValueError: if there are more MULTIPLE rows than gaps to place them in
     '''
-    while True:
-        # shuffle df
-        df = df.sample(frac=1).reset_index(drop=True)
+    # get positions of MULTIPLE and other rows (in random order)
+    is_multiple = (df["TYPE"] == "MULTIPLE").to_numpy()
+    multiple_rows = rng.permutation(np.flatnonzero(is_multiple))
+    other_rows = rng.permutation(np.flatnonzero(~is_multiple))
 
-        # get indices of MULTIPLE
-        multiple_indices = df[df["TYPE"] == "MULTIPLE"].index
+    # check that there is a gap for every MULTIPLE
+    n_gaps = len(other_rows) + 1
 
-        # check if any of the MULTIPLE indices are next to each other
-        if all(multiple_indices[i+1] - multiple_indices[i] != 1 for i in range(len(multiple_indices)-1)):
-            return df
-        else:
-            print("Shuffling again ...")
+    if len(multiple_rows) > n_gaps:
+        raise ValueError(f"Cannot place {len(multiple_rows)} MULTIPLE rows without two being next to each other (only {len(other_rows)} other rows)")
 
+    # pick a distinct gap for each MULTIPLE and compute its final position (shifted by the MULTIPLE rows placed before it)
+    gaps = np.sort(rng.choice(n_gaps, size=len(multiple_rows), replace=False))
+    multiple_positions = gaps + np.arange(len(multiple_rows))
 
-def fix_multiples(df_subset, multiple):
+    # fill in the MULTIPLE rows at their positions and the other rows everywhere else
+    order = np.empty(len(df), dtype=int)
+    is_multiple_position = np.zeros(len(df), dtype=bool)
+    is_multiple_position[multiple_positions] = True
+    order[is_multiple_position] = multiple_rows
+    order[~is_multiple_position] = other_rows
+
+    return df.iloc[order].reset_index(drop=True)
+
+def index_multiples(multiple):
     '''
-    Fix multiples by replacing the multiple with the two entities. E.g., "Dan Jørgensen (S)" -> "Dan Jørgensen" and "(S)".
+    Index multiples by their entity so that the two entities they consist of can be looked up in constant time.
+
+    Args
+        multiple: df with all multiples
+
+    Returns
+        multiple_index: dict with the multiple entity as key and (entity_1, type_1, entity_2, type_2, context) as value
     '''
-    # get multiple
-    df_subset_multiple = df_subset[df_subset["TYPE"] == "MULTIPLE"].iloc[0]
+    # keep the first row if an entity appears more than once
+    multiple = multiple.drop_duplicates(subset="entity", keep="first")
+
+    parts = zip(multiple["entity_1"], multiple["type_1"], multiple["entity_2"], multiple["type_2"], multiple["context"])
+
+    return dict(zip(multiple["entity"], parts))
+
+def fix_multiples(df, multiple_index):
+    '''
+    Fix multiples by replacing the multiple with the two entities. E.g., "Dan Jørgensen (S)" -> "Dan Jørgensen" and "(S)".
+
+    All examples are fixed in one batch and an example may contain any number of multiples.
+    The two entities keep the example (and any other columns, e.g. source) of their multiple and are placed after the other entities of that example.
 
-    # get index of df_subset_multiple in multiple
-    index = multiple[multiple["entity"] == df_subset_multiple["entity"]].index[0]
+    Args
+        df: df with entity, context, TYPE and example columns (ordered by example)
+        multiple_index: dict made with index_multiples
 
-    # get the first and second entity in the multiple
-    entity_1 = multiple.iloc[index]["entity_1"]
-    entity_2 = multiple.iloc[index]["entity_2"]
+    Returns
+        df: df where every multiple is replaced by its two entities
+    '''
+    is_multiple = (df["TYPE"] == "MULTIPLE").to_numpy()
+
+    if not is_multiple.any():
+        return df
+
+    # look up the two entities of every multiple
+    multiples = df[is_multiple]
+    parts = pd.DataFrame([multiple_index[entity] for entity in multiples["entity"]], columns=["entity_1", "type_1", "entity_2", "type_2", "context"])
+
+    # interleave the first and second entities so they stay next to each other
+    n_multiples = len(parts)
+    expanded = pd.DataFrame({
+        "entity": np.empty(n_multiples * 2, dtype=object),
+        "context": np.repeat(parts["context"].to_numpy(), 2),
+        "TYPE": np.empty(n_multiples * 2, dtype=object),
+        "example": np.repeat(multiples["example"].to_numpy(), 2),
+    })
+    for col in df.columns.drop(["entity", "context", "TYPE", "example"]):
+        expanded[col] = np.repeat(multiples[col].to_numpy(), 2)
+
+    expanded.loc[0::2, "entity"] = parts["entity_1"].to_numpy()
+    expanded.loc[1::2, "entity"] = parts["entity_2"].to_numpy()
+    expanded.loc[0::2, "TYPE"] = parts["type_1"].to_numpy()
+    expanded.loc[1::2, "TYPE"] = parts["type_2"].to_numpy()
+
+    # add the new rows after the other entities of their example (stable sort keeps the order within examples)
+    df = pd.concat([df[~is_multiple], expanded], ignore_index=True)
+    df = df.iloc[np.argsort(df["example"].to_numpy(), kind="stable")].reset_index(drop=True)
+
+    return df
+
+def format_entities(df):
+    '''
+    Format entities as "TYPE: entity" and add the context within {} if the entity has any.
 
-    # get the types
-    type_1 = multiple.iloc[index]["type_1"]
-    type_2 = multiple.iloc[index]["type_2"]
+    Args
+        df: df with entity, context and TYPE columns
 
-    context = multiple.iloc[index]["context"]
+    Returns
+        formatted: series with one formatted string per entity
+    '''
+    formatted = df["TYPE"] + ": " + df["entity"].astype(str)
 
-    # replace the multiple with the two entities
-    df_subset = df_subset[df_subset["TYPE"] != "MULTIPLE"]
-    row_1 = {"entity": entity_1, "TYPE": type_1, "context": context}
-    row_2 = {"entity": entity_2, "TYPE": type_2, "context": context}
+    # add context to the entities that have it
+    has_context = df["context"].notna()
+    formatted[has_context] = formatted[has_context] + " {" + df.loc[has_context, "context"].astype(str) + "}"
 
-    # concat new rows to df_subset
-    df_subset = pd.concat([df_subset, pd.DataFrame([row_1, row_2])], ignore_index=True)   
+    return formatted
+
+def create_example_df(df_all, multiple, rng=np.random):
+    '''
+    Partition all entities into examples of 1-4 entities (sizes drawn with sample_number).
 
-    return df_subset
+    The shuffled df is sliced into consecutive examples in a single pass, so the runtime is linear in the number of entities.
 
-def create_examples(df_all, multiple): 
-    # initialize list of examples
-    examples = []
+    Args
+        df_all: df with all (expanded) entities
+        multiple: df with all multiples
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
 
+    Returns
+        df_all: df with the entities of all examples (multiples replaced by their two entities), with an example column and ordered by example
+    '''
     # shuffle all rows in df_all
-    df_all = shuffle_df(df_all)
+    df_all = shuffle_df(df_all, rng=rng)
 
     print("Creating examples ...")
 
-    # check if df_all is empty
-    while len(df_all) != 0:
-        # sample number of entities
-        n_entities = sample_number()
-        
-        # check if we have enough entities left in df_all
-        if n_entities > len(df_all):
-            n_entities = len(df_all)
-        
-        # subset df_all to only include n_entities
-        df_subset = df_all.sample(n_entities, replace=False)
-
-        # drop subsetted entities from all df 
-        df_all = df_all.drop(df_subset.index)
-
-        # check if any of our entities are multiples
-        if "MULTIPLE" in df_subset["TYPE"].values:
-            df_subset = fix_multiples(df_subset, multiple)
-
-        # create example
-        example = []
-        for index, row in df_subset.iterrows():
-            if row["context"] is np.nan:
-                example.append(f"{row['TYPE']}: {row['entity']}")
-            else:
-                example.append(f"{row['TYPE']}: {row['entity']} {{{row['context']}}}")
-    
-        # append example to list of examples
-        examples.append(example)
+    # draw the size of every example and assign each entity to its example
+    sizes = partition_sizes(len(df_all), rng=rng)
+    df_all["example"] = np.repeat(np.arange(len(sizes)), sizes)
+
+    # replace multiples with their two entities
+    df_all = fix_multiples(df_all, index_multiples(multiple))
+
+    return df_all
+
+def create_examples(df_all, multiple):
+    '''
+    Create examples as lists of formatted entities.
+
+    Args
+        df_all: df with all (expanded) entities
+        multiple: df with all multiples
+
+    Returns
+        examples: list of examples, each a list of formatted entities (e.g., ["PERSON: Nina Bang", "GPE: Berlin"])
+    '''
+    df_all = create_example_df(df_all, multiple)
+
+    # format all entities and split them into examples
+    formatted = format_entities(df_all).to_numpy()
+    boundaries = np.flatnonzero(np.diff(df_all["example"].to_numpy())) + 1
+    examples = [list(example) for example in np.split(formatted, boundaries)] if len(formatted) else []
 
     return examples
 
-def write_to_excel(examples, outpath):
+def _create_shard(df_shard, multiple, seed_sequence):
     '''
-    Write examples to escel file.
+    Create the examples of one shard with its own random generator (run in a worker process).
+    '''
+    return create_example_df(df_shard, multiple, rng=np.random.default_rng(seed_sequence))
+
+def create_example_df_sharded(df_all, multiple, seed, n_workers):
     '''
-    # write to csv file - each example is a row
-    df = pd.DataFrame({"entities": examples})
+    Create examples in parallel by splitting the entities into n_workers shards that are processed in a pool of processes.
 
-    df.to_excel(outpath / "annotations.xlsx", index=True) 
+    The pool is split randomly into shards, and each shard gets an independent random generator spawned from np.random.SeedSequence(seed).
+    The shards are merged in order, so the output is reproducible for a given (seed, n_workers).
 
-    print("Done writing to excel file.")
+    Args
+        df_all: df with all (expanded) entities
+        multiple: df with all multiples
+        seed: seed for the random generators
+        n_workers: number of shards (and processes)
 
-def write_to_txt(examples, outpath):
+    Returns
+        df_examples: df with the entities of all examples (see create_example_df)
     '''
-    Write examples to txt file.
+    # spawn one generator for splitting the pool and one for each shard
+    split_sequence, *shard_sequences = np.random.SeedSequence(seed).spawn(n_workers + 1)
+
+    # split the pool randomly into shards
+    order = np.random.default_rng(split_sequence).permutation(len(df_all))
+    shards = [df_all.iloc[rows].reset_index(drop=True) for rows in np.array_split(order, n_workers)]
+
+    # create examples for every shard in parallel
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        shard_dfs = list(executor.map(_create_shard, shards, [multiple] * n_workers, shard_sequences))
+
+    # offset the example ids of each shard so that they continue from the previous shard
+    offset = 0
+
+    for shard_df in shard_dfs:
+        shard_df["example"] += offset
+        offset = shard_df["example"].iloc[-1] + 1 if len(shard_df) else offset
+
+    return pd.concat(shard_dfs, ignore_index=True)
+
+def write_examples(df_examples, writer, chunk_size=100000):
     '''
-    # write to txt file - each example is a row
-    with open(outpath / "annotations.txt", "w") as f:
-        for example in examples:
-            f.write(f"{example}\n")
+    Write examples to an AnnotationWriter in chunks of chunk_size examples, skipping the examples it has already written.
 
-    print("Done writing to txt file.")
-    
-def main():
+    Args
+        df_examples: df from create_example_df
+        writer: AnnotationWriter
+        chunk_size: number of examples per chunk
+    '''
+    example_ids = df_examples["example"].to_numpy()
+    n_examples = example_ids[-1] + 1 if len(example_ids) else 0
+
+    if writer.n_written > 0:
+        print(f"Resuming after {writer.n_written} of {n_examples} examples ...")
+
+    for start in range(writer.n_written, n_examples, chunk_size):
+        # get rows of the examples in this chunk (examples are ordered, so this is a slice)
+        row_start, row_end = np.searchsorted(example_ids, [start, start + chunk_size])
+
+        writer.write(df_to_records(df_examples.iloc[row_start:row_end]))
+
+def update_annotations(records_path, ents_path, outpath, store=None):
+    '''
+    Regenerate only the examples that contain entities from entity lists that changed since the annotation lists were created.
+    The ids of the regenerated examples and their old and new entities are saved to regenerate_rows.csv.
+
+    Args
+        records_path: path to the annotation lists (.jsonl or .parquet)
+        ents_path: path to folder with the entity lists
+        outpath: path to save the report to
+        store: path to an entity store to read the entity lists from (defaults to None i.e., MANUAL_LISTS.xlsx and the csv files)
+    '''
+    # load data (from the entity store if given)
+    if store is not None:
+        df, multiple = load_data(data_path = ents_path, sheets=load_sheets(store, MANUAL_TYPES + ["MULTIPLE"]), coded=load_coded(store, CODED_TYPES))
+        new_hashes = store_hashes(store, df["source"].unique())
+    else:
+        df, multiple = load_data(data_path = ents_path)
+        new_hashes = source_hashes(ents_path, df["source"].unique())
+
+    # compare hashes of the entity lists with those the annotation lists were made from
+    old_hashes = read_sources_manifest(records_path)
+    changed = changed_sources(old_hashes, new_hashes)
+
+    if not changed:
+        print("No entity lists have changed.")
+        return
+
+    print(f"Changed entity lists: {', '.join(changed)}")
+
+    # regenerate the affected examples
+    old_records = read_records(records_path)
+    new_records, regenerated = regenerate_examples(old_records, changed, df, index_multiples(multiple), posessives=generate_posessives)
+
+    # rewrite the annotation lists (unaffected examples are written exactly as before)
+    with AnnotationWriter(records_path, params={**read_manifest(records_path)["params"], "sources": new_hashes}) as writer:
+        writer.write(new_records)
+
+    write_sources_manifest(records_path, new_hashes)
+
+    # report which generations need to be redone
+    report = generation_report(old_records, new_records, regenerated)
+    report.to_csv(outpath / "regenerate_rows.csv", index=False)
+
+    print(f"Regenerated {len(regenerated)} of {len(new_records)} examples. Rows that need new generations are listed in regenerate_rows.csv.")
+
+def add_arguments(parser):
+    '''
+    Add the arguments of the annotation list step to a parser (shared with build_lists.py).
+    '''
+    parser.add_argument("--format", default="jsonl", choices=["jsonl", "parquet"], help="format of the annotation lists")
+    parser.add_argument("--chunk_size", type=int, default=100000, help="number of examples written per chunk")
+    parser.add_argument("--size", type=int, default=None, help="number of entities to draw with replacement (by default every weighted entity is used exactly once)")
+    parser.add_argument("--n_workers", type=int, default=1, help="number of processes to create examples with (1 runs without sharding)")
+    parser.add_argument("--resume", action="store_true", help="resume an interrupted run from its manifest")
+    parser.add_argument("--incremental", action="store_true", help="only regenerate examples with entities from entity lists that changed since the last run")
+    parser.add_argument("--excel", action="store_true", help="also export annotations.xlsx")
+    parser.add_argument("--txt", action="store_true", help="also export annotations.txt")
+    parser.add_argument("--store", type=pathlib.Path, default=None, help="read the entity lists from this entity store (see entity_store.py) instead of MANUAL_LISTS.xlsx and the csv files")
+
+    return parser
+
+def input_parse():
+    '''
+    Parse command line arguments.
+    '''
+    parser = argparse.ArgumentParser(description="Create annotation lists from the entity lists.")
+    add_arguments(parser)
+
+    return parser.parse_args()
+
+def create_annotation_lists(args, ents_path, outpath, sheets=None, coded=None):
+    '''
+    Create the annotation lists and write them to outpath (see input_parse for args).
+
+    Args
+        args: parsed arguments
+        ents_path: path to the entity lists
+        outpath: path to write the annotation lists to
+        sheets, coded: already loaded sheets and generated coded entities (see load_data)
+    '''
     # set seed
-    np.random.seed(1209)
+    seed = 1209
+    np.random.seed(seed)
 
-    # define paths 
-    path = pathlib.Path(__file__)
-    ents_path = path.parents[2] / "dbase" / "entities_lists"
-    outpath =  path.parents[2] / "dbase" / "annotations"
+    records_path = outpath / f"annotations.{args.format}"
 
-    # load data
-    df, multiple = load_data(data_path = ents_path)
+    if args.incremental:
+        update_annotations(records_path, ents_path, outpath, store=args.store)
+    else:
+        # read the lists that are not given from the entity store
+        store_sources = []
 
-    # update weights
-    df = update_weights(df)
+        if args.store is not None:
+            store_sheets = [name for name in MANUAL_TYPES + ["MULTIPLE"] if name not in (sheets or {})]
+            store_coded = [ent_type for ent_type in CODED_TYPES if ent_type not in (coded or {})]
+            store_sources = [f"MANUAL_LISTS.xlsx:{name}" for name in store_sheets] + [f"{ent_type}.csv" for ent_type in store_coded]
+
+            sheets = {**load_sheets(args.store, store_sheets), **(sheets or {})}
+            coded = {**load_coded(args.store, store_coded), **(coded or {})}
 
-    # multiply rows by weight
-    df = expand_data(df)
+        # load data
+        df, multiple = load_data(data_path = ents_path, sheets=sheets, coded=coded)
 
-    # generate posessives
-    df = generate_posessives(df)
+        # save hashes of the entity lists (for incremental updates, and so that a run is only resumed with the same lists)
+        # lists read from the store are hashed as they are in the store, the others from their files
+        hashes = source_hashes(ents_path, [source for source in df["source"].unique() if source not in store_sources])
+        hashes = dict(sorted({**hashes, **store_hashes(args.store, store_sources)}.items()))
 
-    # create examples
-    examples = create_examples(df, multiple)
+        # open writer (from the last checkpoint if resuming)
+        writer = AnnotationWriter(records_path, resume=args.resume, params={"seed": seed, "size": args.size, "n_workers": args.n_workers, "sources": hashes})
 
-    # write to csv
-    write_to_excel(examples, outpath = outpath)
+        if writer.complete:
+            print(f"{records_path.name} is already complete.")
+        else:
+            # update weights
+            df = update_weights(df)
+
+            # draw entities by weight
+            df = expand_data(df, size=args.size)
+
+            # generate posessives
+            df = generate_posessives(df)
+
+            # create examples (in shards if more than one worker)
+            if args.n_workers > 1:
+                df_examples = create_example_df_sharded(df, multiple, seed=seed, n_workers=args.n_workers)
+            else:
+                df_examples = create_example_df(df, multiple)
+
+            # write examples
+            with writer:
+                write_examples(df_examples, writer, chunk_size=args.chunk_size)
+
+            write_sources_manifest(records_path, hashes)
+
+            print(f"Done writing {writer.n_written} examples to {records_path.name}.")
+
+    # optional side outputs
+    if args.excel:
+        export_excel(records_path, outpath = outpath)
+
+    if args.txt:
+        export_txt(records_path, outpath = outpath)
+
+def main():
+    args = input_parse()
+
+    # define paths 
+    path = pathlib.Path(__file__)
+    ents_path = path.parents[2] / "dbase" / "entities_lists"
+    outpath =  path.parents[2] / "dbase" / "annotations"
 
-    # write to txt
-    write_to_txt(examples, outpath = outpath)
+    create_annotation_lists(args, ents_path, outpath)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,118 @@
+'''
+Convert integers to Danish number words (cardinals and ordinals), e.g. 73 -> "treoghalvfjerds" and 21 -> "enogtyvende".
+
+Single numbers are converted with cardinal_words and ordinal_words (both memoized) and arrays of numbers with number_to_words.
+'''
+from functools import lru_cache
+import numpy as np
+
+ONES = ["nul", "en", "to", "tre", "fire", "fem", "seks", "syv", "otte", "ni", "ti",
+        "elleve", "tolv", "tretten", "fjorten", "femten", "seksten", "sytten", "atten", "nitten"]
+
+# tens from 20 to 90 (vigesimal from 50: halvtreds = 2.5 x 20, tres = 3 x 20, ...)
+TENS = {20: "tyve", 30: "tredive", 40: "fyrre", 50: "halvtreds", 60: "tres", 70: "halvfjerds", 80: "firs", 90: "halvfems"}
+
+ORDINAL_ONES = ["nulte", "første", "anden", "tredje", "fjerde", "femte", "sjette", "syvende", "ottende", "niende", "tiende",
+                "ellevte", "tolvte", "trettende", "fjortende", "femtende", "sekstende", "syttende", "attende", "nittende"]
+
+ORDINAL_TENS = {20: "tyvende", 30: "tredivte", 40: "fyrretyvende", 50: "halvtredsindstyvende", 60: "tresindstyvende",
+                70: "halvfjerdsindstyvende", 80: "firsindstyvende", 90: "halvfemsindstyvende"}
+
+# large units with their singular, plural and ordinal form (one thousand and one hundred are neuter: "et tusind", "et hundrede")
+SCALES = [
+    (10**9, "en milliard", "milliarder", "milliardte"),
+    (10**6, "en million", "millioner", "millionte"),
+    (10**3, "et tusind", "tusind", "tusindende"),
+    (10**2, "et hundrede", "hundrede", "hundredende"),
+]
+
+def below_hundred(n, ordinal=False):
+    '''
+    Convert 0-99 to words. The ones come before the tens and are joined with "og" (e.g., 73 -> "treoghalvfjerds").
+    '''
+    if n < 20:
+        return ORDINAL_ONES[n] if ordinal else ONES[n]
+
+    tens, ones = n - n % 10, n % 10
+    tens_word = ORDINAL_TENS[tens] if ordinal else TENS[tens]
+
+    return tens_word if ones == 0 else f"{ONES[ones]}og{tens_word}"
+
+def to_words(n, ordinal=False):
+    '''
+    Convert a non-negative integer to words. "og" is put before the last part if it is below a hundred
+    (e.g., 2005 -> "to tusind og fem", 1250 -> "et tusind to hundrede og halvtreds").
+    '''
+    if n < 0:
+        raise ValueError(f"Cannot convert negative number {n} to words")
+
+    if n < 100:
+        return below_hundred(n, ordinal=ordinal)
+
+    parts = []
+    rest = n
+
+    for scale, singular, plural, ordinal_word in SCALES:
+        count, rest = divmod(rest, scale)
+
+        if count == 0:
+            continue
+
+        # only the last word of the number is an ordinal
+        last = ordinal and rest == 0
+
+        # ordinals do not take "en"/"et" (e.g., 1000 -> "tusindende")
+        if count == 1:
+            word = ordinal_word if last else singular
+        else:
+            word = to_words(count) + " " + (ordinal_word if last else plural)
+
+        parts.append(word)
+
+    if rest:
+        parts.append("og " + below_hundred(rest, ordinal=ordinal))
+
+    return " ".join(parts)
+
+@lru_cache(maxsize=100000)
+def cardinal_words(n):
+    '''
+    Convert an integer to a Danish cardinal (e.g., 42 -> "toogfyrre").
+    '''
+    return to_words(int(n))
+
+@lru_cache(maxsize=100000)
+def ordinal_words(n):
+    '''
+    Convert an integer to a Danish ordinal (e.g., 42 -> "toogfyrretyvende").
+    '''
+    return to_words(int(n), ordinal=True)
+
+@lru_cache(maxsize=None)
+def words_table(ordinal=False):
+    '''
+    Words of all numbers below a thousand (as an object array, so that small numbers can be looked up vectorized).
+    '''
+    return np.array([to_words(n, ordinal=ordinal) for n in range(1000)], dtype=object)
+
+def number_to_words(numbers, ordinal=False):
+    '''
+    Convert an array of integers to Danish cardinals (or ordinals).
+
+    Numbers below a thousand are looked up in a table, and larger numbers are converted once per distinct number.
+
+    Returns
+        words: object array with the words of every number
+    '''
+    numbers = np.asarray(numbers, dtype=np.int64)
+    words = np.empty(numbers.shape, dtype=object)
+
+    is_small = (numbers >= 0) & (numbers < 1000)
+    words[is_small] = words_table(ordinal)[numbers[is_small]]
+
+    if not is_small.all():
+        unique_numbers, inverse = np.unique(numbers[~is_small], return_inverse=True)
+        convert = ordinal_words if ordinal else cardinal_words
+        words[~is_small] = np.array([convert(n) for n in unique_numbers.tolist()], dtype=object)[inverse]
+
+    return words
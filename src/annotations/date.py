@@ -3,32 +3,43 @@ Create a list of dates in different formats.
 '''
 
 import pathlib
-from datetime import datetime, timedelta
-import locale
+import re
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 
-def generate_dates(n_dates, year1=1970, year2=2023):
-    '''
-    Generate a list of dates every day between two years (e.g., 1970-2023)
+# danish month and weekday names (capitalized as in the da_DK.utf-8 locale the lists were first made with), weekdays start on Monday
+MONTHS = ["Januar", "Februar", "Marts", "April", "Maj", "Juni", "Juli", "August", "September", "Oktober", "November", "December"]
+MONTHS_ABBR = ["Jan", "Feb", "Mar", "Apr", "Maj", "Jun", "Jul", "Aug", "Sep", "Okt", "Nov", "Dec"]
+WEEKDAYS = ["Mandag", "Tirsdag", "Onsdag", "Torsdag", "Fredag", "Lørdag", "Søndag"]
+WEEKDAYS_ABBR = ["Man", "Tir", "Ons", "Tor", "Fre", "Lør", "Søn"]
+
+# zero-padded numbers for %d, %m and %y
+PADDED = np.array([f"{i:02d}" for i in range(100)])
+
+def generate_dates(n_dates, year1=1970, year2=2023, replace=False, rng=np.random):
     '''
-    # define start and end date
-    start_date = datetime(year1, 1, 1)
-    end_date = datetime(year2, 12, 31)
+    Sample dates between two years (e.g., 1970-2023) as day offsets from the first day, without listing every day.
 
-    # how many days between each date
-    delta = timedelta(days=1)
+    Args
+        n_dates: number of dates to sample
+        year1, year2: first and last year (both included)
+        replace: whether the same date can be sampled more than once (needed for more dates than there are days)
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
 
-    date_list = []
+    Returns
+        sampled_dates: datetime64[D] array with the sampled dates
+    '''
+    # define start and end date
+    start_date = np.datetime64(f"{year1}-01-01", "D")
+    end_date = np.datetime64(f"{year2}-12-31", "D")
 
-    while start_date <= end_date:
-        date_list.append(start_date.strftime("%Y-%m-%d"))
-        start_date += delta
+    n_days = int((end_date - start_date).astype(np.int64)) + 1
 
-    # sample a subset of dates
-    sampled_date_list = np.random.choice(date_list, n_dates, replace=False)
+    # sample offsets (in days) from the start date
+    offsets = rng.choice(n_days, n_dates, replace=replace)
 
-    return sampled_date_list
+    return start_date + offsets
 
 def define_date_formats():
     '''
@@ -110,44 +121,112 @@ def define_specific_dates():
 
     return all_specific_formats
 
-def format_dates():
+@lru_cache(maxsize=None)
+def compile_date_format(date_format):
     '''
-    Format dates randomly using a variety of date_formats.
+    Split a strftime format (e.g., "%A, %d. %B '%y") into a tuple of literal strings and directives (e.g., "%A").
+
+    Supported directives are %d, %m, %y, %Y, %b, %B, %a, %A and %%.
     '''
-    # generate a list of dates
-    date_formats = define_date_formats()
+    template = []
 
-    # compute length of ents 
-    num_ents = sum(date_formats.values())
+    for part in re.split(r"(%.)", date_format):
+        if not part:
+            continue
 
-    # generate dates 
-    dates = generate_dates(n_dates=num_ents)
+        if part == "%%":
+            part = "%"
+        elif part.startswith("%") and len(part) == 2 and part not in DIRECTIVES:
+            raise ValueError(f"Unsupported directive '{part}' in date format '{date_format}'")
 
-    # make into a list (where key is repeated n times for n values)
-    all_formats = [key for key, value in date_formats.items() for _ in range(value)]
+        template.append(part)
 
-    formatted_dates = []
+    return tuple(template)
 
-    # set locale to danish to get danish month names
-    locale.setlocale(locale.LC_TIME, "da_DK.utf-8")
+def date_parts(dates):
+    '''
+    Get the year, month (1-12), day (1-31) and weekday (0-6, Monday is 0) of datetime64 dates.
+    '''
+    days = np.asarray(dates, dtype="datetime64[D]")
+    months = days.astype("datetime64[M]")
+
+    year = days.astype("datetime64[Y]").astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (days - months).astype(np.int64) + 1
+    weekday = (days.astype(np.int64) + 3) % 7 # 1970-01-01 was a Thursday
+
+    return year, month, day, weekday
+
+DIRECTIVES = {
+    "%d": lambda year, month, day, weekday: PADDED[day],
+    "%m": lambda year, month, day, weekday: PADDED[month],
+    "%y": lambda year, month, day, weekday: PADDED[year % 100],
+    "%Y": lambda year, month, day, weekday: year.astype(str),
+    "%b": lambda year, month, day, weekday: np.array(MONTHS_ABBR)[month - 1],
+    "%B": lambda year, month, day, weekday: np.array(MONTHS)[month - 1],
+    "%a": lambda year, month, day, weekday: np.array(WEEKDAYS_ABBR)[weekday],
+    "%A": lambda year, month, day, weekday: np.array(WEEKDAYS)[weekday],
+}
+
+def format_danish_dates(dates, date_format):
+    '''
+    Format dates with Danish month and weekday names without changing the locale (so it is safe to use from threads and other processes).
 
-    for i, date in enumerate(dates):
-        date_obj = datetime.strptime(date, "%Y-%m-%d")
+    Args
+        dates: datetime64 array (or anything np.asarray can convert to datetime64[D])
+        date_format: strftime format with the directives supported by compile_date_format
 
-        # format the date
-        formatted_date = date_obj.strftime(all_formats[i])
+    Returns
+        formatted: array of strings
+    '''
+    parts = date_parts(dates)
+    formatted = np.full(len(parts[0]), "", dtype=object)
 
-        formatted_dates.append(formatted_date)
+    for part in compile_date_format(date_format):
+        formatted = formatted + (DIRECTIVES[part](*parts).astype(object) if part in DIRECTIVES else part)
 
-    return formatted_dates
+    return formatted
 
-def main(): 
-    np.random.seed(1209)
+def format_dates(date_formats=None, dates=None, rng=np.random):
+    '''
+    Format dates randomly using a variety of date_formats.
 
-    # define paths
-    path = pathlib.Path(__file__)
-    outpath =  path.parents[2] / "dbase" / "entities_lists"
+    Args
+        date_formats: dict with format as key and number of dates to format with it as value (defaults to define_date_formats)
+        dates: datetime64 array with one date per formatted date (defaults to sampling them with generate_dates)
+        rng: random generator used to sample the dates
 
+    Returns
+        formatted_dates: list of formatted dates
+    '''
+    if date_formats is None:
+        date_formats = define_date_formats()
+
+    # compute length of ents 
+    num_ents = sum(date_formats.values())
+
+    # generate dates 
+    if dates is None:
+        dates = generate_dates(n_dates=num_ents, rng=rng)
+
+    dates = np.asarray(dates, dtype="datetime64[D]")
+
+    # the format of every date (where key is repeated n times for n values)
+    all_formats = np.repeat(list(date_formats.keys()), list(date_formats.values()))
+
+    formatted_dates = np.empty(num_ents, dtype=object)
+
+    # format all dates with the same format at once
+    for date_format in date_formats:
+        is_format = all_formats == date_format
+        formatted_dates[is_format] = format_danish_dates(dates[is_format], date_format)
+
+    return formatted_dates.tolist()
+
+def create_date_df():
+    '''
+    Create the DATE entity list (formatted dates and specific dates) with weight and context columns.
+    '''
     # add specific dates
     specific_dates = define_specific_dates()
 
@@ -157,15 +236,23 @@ def main():
     # combine lists
     all_dates = formatted_dates + specific_dates
 
-    # save to file
     df = pd.DataFrame(all_dates, columns=["entity"])
 
     # add weights and context col (to match other lists)
     df["weight"] = 1
     df["context"] = None
 
+    return df
+
+def main(): 
+    np.random.seed(1209)
+
+    # define paths
+    path = pathlib.Path(__file__)
+    outpath =  path.parents[2] / "dbase" / "entities_lists"
+
     # save to file
-    df.to_csv(outpath / "DATE.csv", index=False)
+    create_date_df().to_csv(outpath / "DATE.csv", index=False)
     
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,201 @@
+'''
+Store all entity lists (the sheets of MANUAL_LISTS.xlsx and the coded csv files) in a single Parquet file.
+
+Every list is one row group, named by its source as in create_annotations.load_data (e.g., "MANUAL_LISTS.xlsx:GPE" or "MONEY.csv").
+TYPE and source are dictionary encoded, and the row groups and columns of every list are recorded in the file metadata,
+so a list is read by reading only its row groups (memory-mapped).
+
+Import the current lists with
+    python src/annotations/entity_store.py import
+and export the store back to MANUAL_LISTS.xlsx and csv files with
+    python src/annotations/entity_store.py export --outpath <folder>
+'''
+import argparse
+import json
+import os
+import pathlib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils import load_manual_lists
+
+WORKBOOK = "MANUAL_LISTS.xlsx"
+CODED_TYPES = ["DATE", "MONEY", "PERCENT", "QUANTITY", "PERSON"]
+
+# columns of the store (weight is an integer, all other list columns are strings and null where a list does not have them)
+LIST_COLUMNS = ["entity", "weight", "context", "placement", "only_single_quantity", "number_word", "location", "entity_1", "entity_2", "type_1", "type_2"]
+SCHEMA = pa.schema(
+    [("TYPE", pa.dictionary(pa.int32(), pa.string())), ("source", pa.dictionary(pa.int32(), pa.string()))]
+    + [(column, pa.int64() if column == "weight" else pa.string()) for column in LIST_COLUMNS]
+)
+
+def list_to_table(df, ent_type, source):
+    '''
+    Convert one entity list to a table with the schema of the store.
+    '''
+    unknown = set(df.columns) - set(LIST_COLUMNS)
+
+    if unknown:
+        raise ValueError(f"{source} has columns that are not in the store: {sorted(unknown)}")
+
+    arrays = {
+        "TYPE": pa.DictionaryArray.from_arrays(pa.array([0] * len(df), type=pa.int32()), pa.array([ent_type])),
+        "source": pa.DictionaryArray.from_arrays(pa.array([0] * len(df), type=pa.int32()), pa.array([source])),
+    }
+
+    for column in LIST_COLUMNS:
+        if column not in df.columns:
+            arrays[column] = pa.nulls(len(df), type=SCHEMA.field(column).type)
+        elif column == "weight":
+            arrays[column] = pa.array(df[column].to_numpy(), type=pa.int64())
+        else:
+            values = df[column].astype(object).where(df[column].notna(), None)
+            arrays[column] = pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+    return pa.table(arrays, schema=SCHEMA)
+
+def write_store(lists, store_path):
+    '''
+    Write entity lists to the store (one row group per list).
+
+    Args
+        lists: dict with source as key and (TYPE, df) as value
+        store_path: path to the Parquet file
+    '''
+    # every list is written as one row group, in order
+    metadata = {source: {"TYPE": ent_type, "row_groups": [i], "columns": list(df.columns)} for i, (source, (ent_type, df)) in enumerate(lists.items())}
+    schema = SCHEMA.with_metadata({"lists": json.dumps(metadata)})
+
+    tmp_path = store_path.with_name(store_path.name + ".tmp")
+
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for source, (ent_type, df) in lists.items():
+            writer.write_table(list_to_table(df, ent_type, source).replace_schema_metadata(schema.metadata), row_group_size=max(len(df), 1))
+
+    # replace the store in one step so that readers never see a half written file
+    os.replace(tmp_path, store_path)
+
+def read_metadata(store_path):
+    '''
+    Read the lists in the store with their TYPE, row groups and columns.
+    '''
+    return json.loads(pq.read_metadata(store_path).metadata[b"lists"])
+
+def read_store(store_path, sources=None, types=None, columns=None):
+    '''
+    Read entity lists from the store as one Arrow table (memory-mapped, reading only the row groups of the requested lists).
+
+    Args
+        store_path: path to the Parquet file
+        sources: list of sources to read (e.g., ["MONEY.csv"], defaults to all)
+        types: list of TYPEs to read (e.g., ["GPE", "MULTIPLE"], defaults to all)
+        columns: list of columns to read (defaults to all)
+
+    Returns
+        table: pyarrow Table
+    '''
+    metadata = read_metadata(store_path)
+
+    row_groups = [
+        row_group for source, info in metadata.items()
+        if (sources is None or source in sources) and (types is None or info["TYPE"] in types)
+        for row_group in info["row_groups"]
+    ]
+
+    return pq.ParquetFile(store_path, memory_map=True).read_row_groups(row_groups, columns=columns)
+
+def read_lists(store_path, sources=None):
+    '''
+    Read entity lists from the store as dfs with the columns each list was imported with.
+
+    Returns
+        lists: dict with source as key and df as value
+    '''
+    metadata = read_metadata(store_path)
+    sources = list(metadata) if sources is None else sources
+
+    missing = [source for source in sources if source not in metadata]
+
+    if missing:
+        raise KeyError(f"{store_path.name} has no lists {missing}")
+
+    return {source: read_store(store_path, sources=[source], columns=metadata[source]["columns"]).to_pandas() for source in sources}
+
+def load_sheets(store_path, sheet_names=None):
+    '''
+    Read sheets of MANUAL_LISTS.xlsx from the store (as load_manual_lists does from the workbook, defaults to all sheets).
+    '''
+    if sheet_names is None:
+        sheet_names = [source.split(":")[1] for source in read_metadata(store_path) if source.startswith(f"{WORKBOOK}:")]
+
+    lists = read_lists(store_path, sources=[f"{WORKBOOK}:{name}" for name in sheet_names])
+
+    return {name: lists[f"{WORKBOOK}:{name}"] for name in sheet_names}
+
+def load_coded(store_path, ent_types=CODED_TYPES):
+    '''
+    Read coded entity lists (e.g., MONEY.csv) from the store, as used by create_annotations.load_data.
+    '''
+    lists = read_lists(store_path, sources=[f"{ent_type}.csv" for ent_type in ent_types])
+
+    return {ent_type: lists[f"{ent_type}.csv"] for ent_type in ent_types}
+
+def import_lists(data_path, store_path):
+    '''
+    Import MANUAL_LISTS.xlsx and the coded csv files in data_path into the store.
+    '''
+    lists = {f"{WORKBOOK}:{name}": (name, df) for name, df in load_manual_lists(data_path).items()}
+    lists.update({f"{ent_type}.csv": (ent_type, pd.read_csv(data_path / f"{ent_type}.csv")) for ent_type in CODED_TYPES if (data_path / f"{ent_type}.csv").exists()})
+
+    write_store(lists, store_path)
+
+    return lists
+
+def export_lists(store_path, outpath):
+    '''
+    Export the store to MANUAL_LISTS.xlsx and csv files in outpath.
+    '''
+    lists = read_lists(store_path)
+
+    outpath.mkdir(parents=True, exist_ok=True)
+
+    with pd.ExcelWriter(outpath / WORKBOOK) as writer:
+        for source, df in lists.items():
+            if source.startswith(f"{WORKBOOK}:"):
+                df.to_excel(writer, sheet_name=source.split(":")[1], index=False)
+
+    for source, df in lists.items():
+        if not source.startswith(f"{WORKBOOK}:"):
+            df.to_csv(outpath / source, index=False)
+
+def input_parse():
+    '''
+    Parse command line arguments.
+    '''
+    path = pathlib.Path(__file__)
+    ents_path = path.parents[2] / "dbase" / "entities_lists"
+
+    parser = argparse.ArgumentParser(description="Import the entity lists into a single Parquet store or export the store.")
+    parser.add_argument("command", choices=["import", "export"], help="import the entity lists into the store or export the store")
+    parser.add_argument("--data_path", type=pathlib.Path, default=ents_path, help="folder with MANUAL_LISTS.xlsx and the coded csv files (import)")
+    parser.add_argument("--store", type=pathlib.Path, default=ents_path / "entities.parquet", help="path to the store")
+    parser.add_argument("--outpath", type=pathlib.Path, default=None, help="folder to export the lists to (export)")
+
+    return parser.parse_args()
+
+def main():
+    args = input_parse()
+
+    if args.command == "import":
+        lists = import_lists(args.data_path, args.store)
+        print(f"[INFO:] Imported {len(lists)} lists ({sum(len(df) for _, df in lists.values())} entities) into {args.store}")
+    else:
+        if args.outpath is None:
+            raise ValueError("Give a folder to export to with --outpath")
+
+        export_lists(args.store, args.outpath)
+        print(f"[INFO:] Exported {args.store} to {args.outpath}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+'''
+Incrementally regenerate annotation lists when some of the entity lists change.
+
+Every entity source (a sheet of MANUAL_LISTS.xlsx or one of the coded csv files) gets a content hash.
+When a source changes, only the examples containing entities from it are regenerated, and all other examples are kept as they are.
+'''
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+
+from utils import file_hash, load_manual_lists
+from entity_store import read_lists
+from sampling import AliasSampler
+from writers import format_record
+
+def sheet_hash(df):
+    '''
+    Compute the sha256 hash of the content of a sheet (independent of the other sheets in the workbook).
+    '''
+    return hashlib.sha256(df.to_csv(index=False).encode("utf-8")).hexdigest()
+
+def source_hashes(data_path, sources):
+    '''
+    Compute content hashes for entity sources.
+
+    Args
+        data_path: path to folder with the entity lists
+        sources: list of sources, either csv files (e.g., "MONEY.csv") or workbook sheets (e.g., "MANUAL_LISTS.xlsx:GPE")
+
+    Returns
+        hashes: dict with source as key and hash as value
+    '''
+    # load the sheets of all workbook sources
+    sheet_names = [source.split(":")[1] for source in sources if ":" in source]
+    sheets = load_manual_lists(data_path, sheet_names=sheet_names) if sheet_names else {}
+
+    hashes = {}
+
+    for source in sorted(sources):
+        if ":" in source:
+            hashes[source] = sheet_hash(sheets[source.split(":")[1]])
+        else:
+            hashes[source] = file_hash(data_path / source)
+
+    return hashes
+
+def store_hashes(store_path, sources):
+    '''
+    Compute content hashes for entity sources read from an entity store (see entity_store.py), with sheet_hash of each list.
+
+    Returns
+        hashes: dict with source as key and hash as value
+    '''
+    lists = read_lists(store_path, sources=sorted(sources)) if len(sources) else {}
+
+    return {source: sheet_hash(lists[source]) for source in sorted(sources)}
+
+def sources_manifest_path(records_path):
+    '''
+    Path of the source manifest belonging to an annotation file (e.g., annotations.jsonl -> annotations.jsonl.sources.json).
+    '''
+    return records_path.with_name(f"{records_path.name}.sources.json")
+
+def write_sources_manifest(records_path, hashes):
+    '''
+    Write the hashes of the sources that the annotation lists were created from.
+    '''
+    with open(sources_manifest_path(records_path), "w") as f:
+        json.dump(hashes, f, indent=2)
+
+def read_sources_manifest(records_path):
+    '''
+    Read the hashes of the sources that the annotation lists were created from.
+    '''
+    path = sources_manifest_path(records_path)
+
+    if not path.exists():
+        raise FileNotFoundError(f"{path.name} does not exist. Run create_annotations.py without --incremental first.")
+
+    with open(path) as f:
+        return json.load(f)
+
+def changed_sources(old_hashes, new_hashes):
+    '''
+    Get the sources that were added, removed or changed between two sets of hashes.
+    '''
+    sources = set(old_hashes) | set(new_hashes)
+
+    return sorted(source for source in sources if old_hashes.get(source) != new_hashes.get(source))
+
+def entity_dict(label, entity, context, source):
+    '''
+    Create the dict for one entity in a record.
+    '''
+    return {"label": label, "entity": str(entity), "context": None if pd.isna(context) else str(context), "source": source}
+
+def draw_entities(df_source, n, multiple_index, posessives, rng=np.random):
+    '''
+    Draw n entities (by weight, with replacement) from the entities of one source.
+
+    Args
+        df_source: df with the entities of one source (with weight column)
+        n: number of entities to draw
+        multiple_index: dict made with index_multiples (multiples are returned as their two entities)
+        posessives: function to alter some entities to be posessives (generate_posessives)
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+
+    Returns
+        drawn: list with n lists of entity dicts (one entity, or two for multiples)
+    '''
+    indices = AliasSampler(df_source["weight"]).sample(n, rng=rng)
+    df_drawn = posessives(df_source.iloc[indices].reset_index(drop=True), rng=rng)
+
+    drawn = []
+
+    for row in df_drawn.itertuples(index=False):
+        if row.TYPE == "MULTIPLE":
+            entity_1, type_1, entity_2, type_2, context = multiple_index[row.entity]
+            drawn.append([entity_dict(type_1, entity_1, context, row.source), entity_dict(type_2, entity_2, context, row.source)])
+        else:
+            drawn.append([entity_dict(row.TYPE, row.entity, row.context, row.source)])
+
+    return drawn
+
+def regenerate_examples(records, changed, df_all, multiple_index, posessives, rng=np.random):
+    '''
+    Replace the entities from changed sources with new entities from the current version of their source.
+
+    Only examples that contain an entity from a changed source are touched, and entities from unchanged sources keep their place.
+    Entities from sources that no longer exist are removed.
+
+    Args
+        records: list of records (see writers.df_to_records)
+        changed: list of changed sources
+        df_all: df with all (unexpanded) entities, their weight and source
+        multiple_index: dict made with index_multiples
+        posessives: function to alter some entities to be posessives (generate_posessives)
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+
+    Returns
+        records: list of records where the affected examples are regenerated
+        regenerated: list of ids of the regenerated examples
+    '''
+    changed = set(changed)
+
+    for record in records:
+        if any(ent["source"] is None for ent in record["entities"]):
+            raise ValueError("The annotation lists have no sources. Run create_annotations.py without --incremental first.")
+
+    regenerated = [i for i, record in enumerate(records) if any(ent["source"] in changed for ent in record["entities"])]
+
+    # find the slots to fill for every source (multiples count once although they are two entities)
+    slots = {}
+
+    for i in regenerated:
+        entities = records[i]["entities"]
+        j = 0
+
+        while j < len(entities):
+            source = entities[j]["source"]
+            width = 2 if source.endswith(":MULTIPLE") else 1
+
+            if source in changed:
+                slots.setdefault(source, []).append((i, j, width))
+
+            j += width
+
+    # draw new entities for the slots of each source
+    replacements = {}
+
+    for source, source_slots in sorted(slots.items()):
+        df_source = df_all[df_all["source"] == source]
+
+        drawn = draw_entities(df_source, len(source_slots), multiple_index, posessives, rng=rng) if len(df_source) else [[] for _ in source_slots]
+
+        for (i, j, width), entities in zip(source_slots, drawn):
+            replacements[(i, j)] = (width, entities)
+
+    # rebuild the regenerated examples (as new records, so the original records are left untouched)
+    records = list(records)
+
+    for i in regenerated:
+        old_entities = records[i]["entities"]
+        new_entities = []
+        j = 0
+
+        while j < len(old_entities):
+            if (i, j) in replacements:
+                width, entities = replacements[(i, j)]
+                new_entities.extend(entities)
+                j += width
+            else:
+                new_entities.append(old_entities[j])
+                j += 1
+
+        records[i] = {"id": records[i]["id"], "entities": new_entities}
+
+    return records, [records[i]["id"] for i in regenerated]
+
+def generation_report(old_records, new_records, regenerated):
+    '''
+    Report which rows of annotations_w_generations.xlsx need new generations.
+
+    Args
+        old_records, new_records: records before and after regenerating
+        regenerated: list of ids of the regenerated examples
+
+    Returns
+        report: df with the example id, its row in the ENTS and NO ENTS sheets (as shown in Excel) and the old and new entities
+    '''
+    old_by_id = {record["id"]: record for record in old_records}
+    new_by_id = {record["id"]: record for record in new_records}
+
+    report = pd.DataFrame({
+        "id": regenerated,
+        "excel_row": [i + 2 for i in regenerated], # one header row and Excel counts from 1
+        "old_entities": [format_record(old_by_id[i]) for i in regenerated],
+        "new_entities": [format_record(new_by_id[i]) for i in regenerated],
+    })
+
+    return report
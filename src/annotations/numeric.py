@@ -0,0 +1,219 @@
+'''
+Create numeric ents (MONEY, QUANTITY and PERCENT) from a table of units and pools of numbers.
+
+Every entity type is a spec in NUMERIC_SPECS: where its units come from, which numbers (and number words) to draw from and how often
+numeric amounts are followed by a space. A new numeric entity type only needs a new spec.
+'''
+
+import pathlib
+import numpy as np
+import pandas as pd
+
+from utils import number_words, load_manual_lists, SMALL_NUMBERS
+from danish_numbers import number_to_words
+from sampling import AliasSampler
+
+def percent_number_words():
+    '''
+    Number words used for PERCENT (edge cases), twice as often as in the list.
+    '''
+    return np.tile(number_to_words(SMALL_NUMBERS + [1000, 100]), 2)
+
+# units: sheet in MANUAL_LISTS.xlsx or a df with the units
+# numbers: pools of random numbers (integers in [low, high), or floats rounded to decimals)
+# words: function returning the number words (in the pool with the numbers)
+# space_prob: probability of a space between a numeric amount and its unit (number words are always followed by a space)
+NUMERIC_SPECS = {
+    "MONEY": {
+        "units": "MONEY",
+        "numbers": [{"low": 1, "high": 350, "size": 100}, {"low": 1000, "high": 10000, "size": 50}],
+        "words": number_words,
+        "space_prob": 0.5,
+    },
+    "QUANTITY": {
+        "units": "QUANTITY",
+        "numbers": [{"low": 1, "high": 350, "size": 150}, {"low": 1000, "high": 10000, "size": 25}],
+        "words": number_words,
+        "space_prob": 0.8,
+    },
+    "PERCENT": {
+        "units": pd.DataFrame({"entity": ["%"], "weight": [260], "word_entity": ["procent"]}),
+        "numbers": [{"low": 0, "high": 100, "size": 40, "decimals": 2}, {"low": 0, "high": 100, "size": 160}],
+        "words": percent_number_words,
+        "space_prob": 0.8,
+    },
+}
+
+# columns of the unit table and their value if a table does not have them
+UNIT_DEFAULTS = {"placement": "after", "only_single_quantity": "NO", "number_word": "YES", "word_entity": None}
+
+def load_units(spec, data_path, sheets=None):
+    '''
+    Load the unit table of a spec (from sheets if it is already loaded) and fill in missing columns with UNIT_DEFAULTS.
+
+    Columns
+        entity: the unit (e.g., "kr.", "km" or "%")
+        weight: how many times the unit is used
+        placement: "after" the amount, "before" it or "both" (drawn for every amount)
+        only_single_quantity: "YES" if the unit is only used with "en" or "1" (e.g., "krone")
+        number_word: "YES" if the unit can follow number words
+        word_entity: unit to use after number words instead of entity (e.g., "procent" instead of "%")
+    '''
+    if isinstance(spec["units"], str) and sheets is not None and spec["units"] in sheets:
+        units = sheets[spec["units"]].copy()
+    elif isinstance(spec["units"], str):
+        units = load_manual_lists(data_path, sheet_names=[spec["units"]])[spec["units"]]
+    else:
+        units = spec["units"].copy()
+
+    for column, default in UNIT_DEFAULTS.items():
+        if column not in units.columns:
+            units[column] = default
+
+    units["word_entity"] = units["word_entity"].fillna(units["entity"])
+
+    return units
+
+def draw_numbers(pools, rng=np.random):
+    '''
+    Draw the numbers of all pools and return them as strings.
+    '''
+    numbers = []
+
+    for pool in pools:
+        if "decimals" in pool:
+            numbers.append(rng.uniform(pool["low"], pool["high"], size=pool["size"]).round(pool["decimals"]).astype(str))
+        else:
+            numbers.append(rng.choice(np.arange(pool["low"], pool["high"]), size=pool["size"]).astype(str))
+
+    return np.concatenate(numbers).astype(object)
+
+def join_amounts(nums, is_word, units, word_units, placements, space_prob, rng=np.random):
+    '''
+    Put units before or after amounts. Amounts in words are always followed by a space (and their word unit),
+    numeric amounts are followed by a space with probability space_prob.
+
+    Args
+        nums: object array of amounts (as strings)
+        is_word: bool array, whether each amount is in words
+        units, word_units: object arrays with the unit of every amount (and the unit to use if the amount is in words)
+        placements: array with "before" or "after" for every amount
+        space_prob: probability of a space between a numeric amount and its unit
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+
+    Returns
+        formatted: object array with the formatted amounts
+    '''
+    spaces = np.where(is_word | (rng.random(len(nums)) < space_prob), " ", "").astype(object)
+    units = np.where(is_word, word_units, units)
+    after = placements == "after"
+
+    formatted = np.empty(len(nums), dtype=object)
+    formatted[after] = nums[after] + spaces[after] + units[after]
+    formatted[~after] = units[~after] + spaces[~after] + nums[~after]
+
+    return formatted
+
+def generate_numeric(spec, data_path, size=None, rng=np.random, sheets=None):
+    '''
+    Generate the entities of one numeric spec.
+
+    Units are grouped by (placement, only_single_quantity, number_word) and the amounts, placements and spacing of a group are drawn at once:
+        only_single_quantity YES: "en" or "1" followed by the unit
+        number_word YES: amounts (in numbers or words) after the unit, or numeric amounts before it
+        number_word NO: numeric amounts before or after the unit
+    A placement of "both" is drawn as "before" or "after" for every amount.
+
+    Args
+        spec: dict from NUMERIC_SPECS
+        data_path: path to folder with MANUAL_LISTS.xlsx
+        size: number of entities to generate, drawing units by weight. If None, every unit is used weight times.
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+        sheets: dict with already loaded sheets of MANUAL_LISTS.xlsx
+
+    Returns
+        formatted: list with the formatted entities
+    '''
+    units = load_units(spec, data_path, sheets=sheets)
+
+    # pool of numbers and words (numbers first, so positions from len(numeric_numbers) on are words)
+    numeric_numbers = draw_numbers(spec["numbers"], rng=rng)
+    all_numbers = np.concatenate([numeric_numbers, spec["words"]().astype(object)])
+
+    # duplicate units based on weight (or draw size units by weight)
+    if size is None:
+        units = units.loc[units.index.repeat(units["weight"])].reset_index(drop=True)
+    else:
+        units = units.iloc[AliasSampler(units["weight"]).sample(size, rng=rng)].reset_index(drop=True)
+
+    formatted = np.empty(len(units), dtype=object)
+
+    for (placement, single_quantity, number_word), group in units.groupby(["placement", "only_single_quantity", "number_word"], sort=True):
+        n = len(group)
+        entities = group["entity"].to_numpy(dtype=object)
+
+        if single_quantity == "YES":
+            nums = rng.choice(np.array(["en", "1"], dtype=object), size=n)
+            formatted[group.index] = nums + " " + entities
+            continue
+
+        # if placement is both, update placement to before or after based on random choice
+        placements = rng.choice(["before", "after"], size=n) if placement == "both" else np.full(n, placement)
+
+        # draw positions of amounts (amounts in words are only used after the unit)
+        if number_word == "YES":
+            positions = np.where(placements == "after", rng.choice(len(all_numbers), size=n), rng.choice(len(numeric_numbers), size=n))
+        else:
+            positions = rng.choice(len(numeric_numbers), size=n)
+
+        formatted[group.index] = join_amounts(all_numbers[positions], positions >= len(numeric_numbers), entities, group["word_entity"].to_numpy(dtype=object), placements, spec["space_prob"], rng=rng)
+
+    return formatted.tolist()
+
+def generate_all_numeric(data_path, ent_types=None, size=None, seed=1209, sheets=None):
+    '''
+    Generate the entities of several numeric specs (defaults to all of NUMERIC_SPECS).
+
+    The global seed is set before every spec, so each list is the same as when it is generated on its own (e.g., with money.py).
+
+    Returns
+        entities: dict with entity type as key and list of formatted entities as value
+    '''
+    ent_types = ent_types or list(NUMERIC_SPECS)
+
+    entities = {}
+
+    for ent_type in ent_types:
+        np.random.seed(seed)
+        entities[ent_type] = generate_numeric(NUMERIC_SPECS[ent_type], data_path, size=size, sheets=sheets)
+
+    return entities
+
+def entities_to_df(entities):
+    '''
+    Make a list of entities into a df in the format of the other entity lists (with weight and context columns).
+    '''
+    df = pd.DataFrame(entities, columns=["entity"])
+
+    # add weights and context col (to match other lists)
+    df["weight"] = 1
+    df["context"] = None
+
+    return df
+
+def save_entities(entities, outpath):
+    '''
+    Save a list of entities as a csv in the format of the other entity lists.
+    '''
+    entities_to_df(entities).to_csv(outpath, index=False)
+
+def main():
+    # define paths
+    path = pathlib.Path(__file__)
+    ents_path = path.parents[2] / "dbase" / "entities_lists"
+
+    for ent_type, entities in generate_all_numeric(ents_path).items():
+        save_entities(entities, ents_path / f"{ent_type}.csv")
+
+if __name__ == "__main__":
+    main()
@@ -7,88 +7,173 @@ import numpy as np
 import string
 import random
 
-# create the tags for the PERSON entity
-def txt_to_df(path: pathlib.Path):
+from utils import file_hash, load_manual_lists
+from sampling import weighted_sample
+
+class NameTable:
+    '''
+    Compact table of names and the amount of people with each name.
+
+    Names are stored as one UTF-8 buffer with int64 offsets (the name in row i is data[offsets[i]:offsets[i+1]]) and amounts are int32.
+    The arrays may be memory-mapped from the cache written by load_name_table.
+
+    Args
+        data: uint8 array with the UTF-8 encoded names (concatenated)
+        offsets: int64 array of length n_rows + 1 with the position of each name in data
+        amounts: int32 array with the amount of people with each row's name
     '''
-    Load a txt file into a dataframe
+    def __init__(self, data, offsets, amounts):
+        self.data = data
+        self.offsets = offsets
+        self.amounts = amounts
+
+    @classmethod
+    def from_names(cls, names, amounts):
+        '''
+        Create a NameTable from a list of names and their amounts.
+        '''
+        encoded = [name.encode("utf-8") for name in names]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(name) for name in encoded], out=offsets[1:])
+
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets, np.asarray(amounts, dtype=np.int32))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def names_at(self, indices):
+        '''
+        Decode the names of the rows at indices.
+        '''
+        data = memoryview(self.data)
+
+        return [str(data[self.offsets[i]:self.offsets[i + 1]], "utf-8") for i in indices]
+
+    @property
+    def names(self):
+        return self.names_at(range(len(self)))
+
+    def take(self, indices):
+        '''
+        Get the rows at indices as a dataframe with name and amount columns (in the order of indices).
+        '''
+        indices = np.asarray(indices, dtype=np.int64)
+
+        return pd.DataFrame({"name": pd.Series(self.names_at(indices), dtype=object), "amount": np.asarray(self.amounts)[indices]})
+
+    def sample(self, n, exponent=1.0, replace=False, rng=np.random):
+        '''
+        Draw n names in proportion to amount ** exponent (see sample_person_tags).
+
+        Returns
+            sampled: dataframe with name and amount of the drawn rows (in the order they were drawn)
+        '''
+        return self.take(weighted_sample(np.asarray(self.amounts, dtype=np.float64) ** exponent, n, replace=replace, rng=rng))
+
+def parse_name_table(path: pathlib.Path):
     '''
+    Parse a tab-separated (latin-1) name table from Danmarks Statistik into a NameTable.
 
-    df = pd.read_fwf(path, encoding="latin-1", header=None, sep = "\t")
+    Rows without a numeric amount (metadata and headers) and the "000" row are skipped and names are capitalized
+    (if it is a hyphenated name, both parts are capitalized).
+    '''
+    df = pd.read_csv(path, sep="\t", encoding="latin-1", header=None, names=["name", "amount"], usecols=[0, 1], dtype=str, na_filter=False)
+
+    # keep rows with a name and a numeric amount (the metadata rows have neither)
+    amounts = pd.to_numeric(df["amount"].str.strip(), errors="coerce")
+    keep = amounts.notna() & (df["name"].str.strip() != "") & (df["name"] != "000")
 
-    # split the data into columns
-    df = df[0].str.split('\t', expand=True)
+    # capitalize names
+    names = df.loc[keep, "name"].str.strip().str.title().tolist()
 
-    return df
+    return NameTable.from_names(names, amounts[keep].to_numpy(dtype=np.int32))
 
-def preprocess_person_df(df:pd.DataFrame, remove_first_two_rows:bool=True):
+def load_name_table(path: pathlib.Path, use_cache:bool=True):
     '''
-    Preprocess the person df from txt file. 
-    Optionally remove the first two rows (first name dataframes have two rows of metadata which the last name dataframe does not have).
+    Load a name table from Danmarks Statistik.
+
+    The parsed arrays are cached as .npy files in a .cache folder next to the table (keyed by the hash of the table) and memory-mapped in later calls.
 
     Args
-        df: dataframe with names and amount of times they appear
-        remove_first_two_rows: whether to remove the first two rows or not
+        path: path to the txt file with the names
+        use_cache: whether to read and write the cache
 
     Returns
-        new_df: preprocessed dataframe with capitalized names and colnames in English
+        table: NameTable
     '''
+    if not use_cache:
+        return parse_name_table(path)
 
-    # remove first two row 
-    df = df.iloc[2:]
+    cache_path = path.parent / ".cache" / f"{path.stem}_{file_hash(path)[:16]}.utf8"
+    fields = ["data", "offsets", "amounts"]
 
-    # rename the columns
-    df.columns = ["name", "amount"]
+    # parse the table and write the cache if it does not exist
+    if not cache_path.exists():
+        table = parse_name_table(path)
 
-    # make amount column numeric
-    df["amount"] = pd.to_numeric(df["amount"])
+        # write to a temporary folder first so that an interrupted write does not leave a partial cache
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        tmp_path.mkdir(parents=True, exist_ok=True)
 
-    # remove row containing "000" as name
-    df = df.loc[df["name"] != "000"]
+        for field in fields:
+            np.save(tmp_path / f"{field}.npy", getattr(table, field))
 
-    # copy df
-    new_df = df.copy()
+        tmp_path.rename(cache_path)
 
-    # capitalize the names (but if it is a hyphenated name, capitalize both parts)
-    new_df["name"] = new_df["name"].str.title()
+    return NameTable(*[np.load(cache_path / f"{field}.npy", mmap_mode="r") for field in fields])
 
-    return new_df
-
-def sample_person_tags(person_df:pd.DataFrame, n_names_total:int=200, high:int=2000, low:int=10, ratio:tuple=(0.75, 0.25), verbose=True):
+def sample_person_tags(table:NameTable, n_names_total:int=200, high:int=2000, low:int=10, ratio:tuple=(0.75, 0.25), mode:str="frequency", exponent:float=1.0, rng=np.random, verbose=True):
     '''
     Sample PERSON tags from the list of names. Account for the amount of times the name appears in df (sampling more frequent names more often).
 
+    With mode="frequency", names are drawn (without replacement) in proportion to amount ** exponent over the whole list.
+    An exponent below 1 flattens the distribution (more rare names), and an exponent of 0 draws uniformly.
+    With mode="buckets", names are split into common and rare names by amount and a fixed ratio is drawn uniformly from each (the original scheme).
+
     Args
-        person_df: dataframe with names and amount of times they appear
-        n_names_total: total number of names to sample (common + rare)
-        high: upper bound for amount of times a name has to appear to be considered common
-        low: lower bound for amount of times a name has to appear to be considered rare
-        ratio: ratio of common names to rare names (common, rare). Values must sum to 1.
-    
+        table: NameTable with names and amount of times they appear
+        n_names_total: total number of names to sample
+        high: (buckets) upper bound for amount of times a name has to appear to be considered common
+        low: (buckets) lower bound for amount of times a name has to appear to be considered rare
+        ratio: (buckets) ratio of common names to rare names (common, rare). Values must sum to 1.
+        mode: "frequency" or "buckets"
+        exponent: (frequency) exponent that the amounts are raised to
+        rng: (frequency) random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+
     Returns
         sampled_names: dataframe with sampled names
-        info_before, info_after: info about the length of the pools before and after sampling
     '''
+    if mode == "frequency":
+        sampled_names = table.sample(n_names_total, exponent=exponent, rng=rng)
+
+        info_before = f"Length of pool BEFORE sampling: {len(table)}"
+        info_after = f"Length of pool AFTER sampling: {len(sampled_names)} (median amount {sampled_names['amount'].median():.0f})"
 
-    # raise value error if ratio does not sum to 1
-    if sum(ratio) != 1:
-        raise ValueError("Ratio must sum to 1")
+    elif mode == "buckets":
+        # raise value error if ratio does not sum to 1
+        if sum(ratio) != 1:
+            raise ValueError("Ratio must sum to 1")
 
-    # sample names
-    common_names = person_df.loc[person_df["amount"] >= high]
-    rare_names = person_df.loc[(person_df["amount"] < high) & (person_df["amount"] > low)] 
+        # rows of both pools
+        amounts = np.asarray(table.amounts)
+        common_rows = np.flatnonzero(amounts >= high)
+        rare_rows = np.flatnonzero((amounts < high) & (amounts > low))
 
-    # info 
-    info_before = f"Length of pools BEFORE sampling:\nCommon names: {len(common_names)}, Rare names: {len(rare_names)}"
+        # info 
+        info_before = f"Length of pools BEFORE sampling:\nCommon names: {len(common_rows)}, Rare names: {len(rare_rows)}"
 
-    # sample names from both pools 
-    common_names = common_names.sample(int(round(n_names_total*ratio[0], 0)), replace=False, random_state=1209)
-    rare_names = rare_names.sample(int(round(n_names_total*ratio[1], 0)), replace=False, random_state=1209)
+        # sample names from both pools (drawn as DataFrame.sample with random_state=1209 does)
+        common_rows = common_rows[np.random.RandomState(1209).choice(len(common_rows), size=int(round(n_names_total*ratio[0], 0)), replace=False)]
+        rare_rows = rare_rows[np.random.RandomState(1209).choice(len(rare_rows), size=int(round(n_names_total*ratio[1], 0)), replace=False)]
 
-    # info 
-    info_after = f"Length of pools AFTER sampling:\nCommon names: {len(common_names)}, Rare names: {len(rare_names)}"
+        # info 
+        info_after = f"Length of pools AFTER sampling:\nCommon names: {len(common_rows)}, Rare names: {len(rare_rows)}"
 
-    # combine the two dfs
-    sampled_names = pd.concat([common_names, rare_names])
+        # combine the two pools
+        sampled_names = table.take(np.concatenate([common_rows, rare_rows]))
+
+    else:
+        raise ValueError(f"Unknown mode '{mode}'. Use 'frequency' or 'buckets'")
 
     # sort by amount
     sampled_names = sampled_names.sort_values(by="amount", ascending=False).reset_index(drop=True)
@@ -111,17 +196,13 @@ def load_persons(data_path, df_names: list=["first_names_women_2023.txt", "first
         data_path: path to the data folder with the three "normal" persons lists
     '''
     # load the three lists
-    dfs = [txt_to_df(data_path / name) for name in df_names]
-
-    # preprocess the dfs, but do it differently for the last names
-    women_df, men_df = [preprocess_person_df(df, remove_first_two_rows=True) for df in dfs[:2]]
-    last_names_df = preprocess_person_df(dfs[2], remove_first_two_rows=False)
+    women_table, men_table, last_names_table = [load_name_table(data_path / name) for name in df_names]
 
-    return men_df, women_df, last_names_df
+    return men_table, women_table, last_names_table
 
-def sample_persons(men_df, women_df, last_names_df):
+def sample_persons(men_table, women_table, last_names_table, mode="frequency", exponent=1.0, rng=np.random):
     '''
-    Sample persons from the three lists.
+    Sample persons from the three NameTables (see sample_person_tags for mode and exponent).
     '''
     # first names
     n_men_names = 250
@@ -131,11 +212,11 @@ def sample_persons(men_df, women_df, last_names_df):
     n_last_names = 500
     
     # sample first names
-    sampled_men_df = sample_person_tags(men_df, n_names_total=n_men_names, high=1000, low=200, ratio=(0.75, 0.25))
-    sampled_women_df = sample_person_tags(women_df, n_names_total=n_women_names, high=1000, low=200, ratio=(0.75, 0.25))
+    sampled_men_df = sample_person_tags(men_table, n_names_total=n_men_names, high=1000, low=200, ratio=(0.75, 0.25), mode=mode, exponent=exponent, rng=rng)
+    sampled_women_df = sample_person_tags(women_table, n_names_total=n_women_names, high=1000, low=200, ratio=(0.75, 0.25), mode=mode, exponent=exponent, rng=rng)
     
     # sample last names
-    sampled_last_names_df = sample_person_tags(last_names_df, n_names_total=n_last_names, high=1000, low=100, ratio=(0.75, 0.25))
+    sampled_last_names_df = sample_person_tags(last_names_table, n_names_total=n_last_names, high=1000, low=100, ratio=(0.75, 0.25), mode=mode, exponent=exponent, rng=rng)
 
     # lists of sampled names
     name_lists = []
@@ -150,219 +231,210 @@ def sample_persons(men_df, women_df, last_names_df):
 
     return sampled_men, sampled_women, sampled_last_names
 
-def get_first_names(sampled_men, sampled_women, n_entities=100):
+class NamePool:
     '''
-    Obtain entites that consist of just a first name
-    '''
-
-    # sample 50 entities from each list
-    men_first_names = np.random.choice(sampled_men, size=n_entities//2, replace=False)
-    women_first_names = np.random.choice(sampled_women, size=n_entities//2, replace=False)
+    Pool of names to draw from without replacement.
 
-    # obtain all names that have not been sampled
-    sampled_men_remaining = [name for name in sampled_men if name not in men_first_names]
-    sampled_women_remaining = [name for name in sampled_women if name not in women_first_names]
+    The names are kept in an array with a dict from name to position. Drawing a name swaps it with the last name in the pool and shrinks the pool,
+    so drawing (and removing) a name is O(1) no matter how large the pool is.
 
-    # combine the two lists
-    first_names = list(men_first_names) + list(women_first_names)
+    Args
+        names: list of (unique) names
+    '''
+    def __init__(self, names):
+        self.names = np.array(names, dtype=object)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.size = len(self.names)
+
+        if len(self.positions) != self.size:
+            raise ValueError("Names in a NamePool must be unique")
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def remaining(self):
+        '''
+        Get the names that have not been drawn.
+        '''
+        return list(self.names[:self.size])
+
+    def draw(self, n, rng=np.random):
+        '''
+        Draw n names without replacement and remove them from the pool.
+
+        Args
+            n: number of names to draw
+            rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+
+        Returns
+            drawn: array with the drawn names (in the order they were drawn)
+        '''
+        if n > self.size:
+            raise ValueError(f"Cannot draw {n} names from a pool with {self.size} names left")
+
+        # draw all random numbers at once and move each drawn name to the end of the pool (partial Fisher-Yates shuffle)
+        u = rng.random(n)
+
+        for k in range(n):
+            i = int(u[k] * self.size)
+            self._swap(i, self.size - 1)
+            self.size -= 1
+            del self.positions[self.names[self.size]]
+
+        # names at the end of the array are the drawn ones (last drawn first)
+        return self.names[self.size:self.size + n][::-1].copy()
+
+    def _swap(self, i, j):
+        self.names[i], self.names[j] = self.names[j], self.names[i]
+        self.positions[self.names[i]] = i
+        self.positions[self.names[j]] = j
+
+def draw_initials(n, replace, rng=np.random):
+    '''
+    Draw n uppercase initials with a dot (e.g., "K.").
+    '''
+    initials = rng.choice(list(string.ascii_uppercase), size=n, replace=replace)
 
-    return first_names, sampled_men_remaining, sampled_women_remaining
+    return [initial + "." for initial in initials]
 
-def get_last_names(sampled_last_names, n_entities=25):
+def get_first_names(men_pool, women_pool, n_entities=100, rng=np.random):
     '''
-    Obtain entities that consist of just a last name
+    Obtain entites that consist of just a first name
     '''
+    # sample half of the entities from each pool
+    first_names = list(men_pool.draw(n_entities//2, rng=rng)) + list(women_pool.draw(n_entities//2, rng=rng))
 
-    # sample 50 entities from each list
-    last_names = np.random.choice(sampled_last_names, size=n_entities, replace=False)
+    return first_names
 
-    # obtain all names that have not been sampled
-    sampled_last_names_remaining = [name for name in sampled_last_names if name not in last_names]
+def get_last_names(last_name_pool, n_entities=25, rng=np.random):
+    '''
+    Obtain entities that consist of just a last name
+    '''
+    last_names = list(last_name_pool.draw(n_entities, rng=rng))
 
-    return last_names, sampled_last_names_remaining
+    return last_names
 
-def get_first_and_last_names(sampled_men, sampled_women, sampled_last_names, n_entities=100): 
+def get_first_and_last_names(men_pool, women_pool, last_name_pool, n_entities=100, rng=np.random):
     '''
     Obtain entities that consist of a first and last name
     '''
-    # sample 50 entities from each gender
-    men_first_names = np.random.choice(sampled_men, size=n_entities//2, replace=False)
-    women_first_names = np.random.choice(sampled_women, size=n_entities//2, replace=False)
+    # sample half of the first names from each gender
+    first_names = get_first_names(men_pool, women_pool, n_entities=n_entities, rng=rng)
 
-    # sample 100 last names
-    last_names = np.random.choice(sampled_last_names, size=n_entities, replace=False)
-
-    # obtain all names that have not been sampled
-    sampled_men_remaining = [name for name in sampled_men if name not in men_first_names]
-    sampled_women_remaining = [name for name in sampled_women if name not in women_first_names]
-    sampled_last_names_remaining = [name for name in sampled_last_names if name not in last_names]
-
-    # combine the two lists
-    first_names = list(men_first_names) + list(women_first_names)
-
-    first_last_names = []
+    # sample a last name for each first name
+    last_names = last_name_pool.draw(n_entities, rng=rng)
 
     # combine the two ents into one 
-    for first_name, last_name in zip(first_names, last_names):
-        first_last_names.append(first_name + " " + last_name)
-
-    return first_last_names, sampled_men_remaining, sampled_women_remaining, sampled_last_names_remaining
+    first_last_names = [first_name + " " + last_name for first_name, last_name in zip(first_names, last_names)]
 
+    return first_last_names
 
-def get_double_first_name(sampled_men, sampled_women, n_entities=26):
+def get_double_first_name(men_pool, women_pool, n_entities=26, rng=np.random):
     '''
     Obtain entities that consist of a double first name
     '''
-    # sample 26 ents from each gender
-    men_first_names = np.random.choice(sampled_men, size=n_entities, replace=False)
-    women_first_names = np.random.choice(sampled_women, size=n_entities, replace=False)
-
-    # obtain all names that have not been sampled
-    sampled_men_remaining = [name for name in sampled_men if name not in men_first_names]
-    sampled_women_remaining = [name for name in sampled_women if name not in women_first_names]
+    # sample n_entities names from each gender (two per entity)
+    men_first_names = men_pool.draw(n_entities, rng=rng)
+    women_first_names = women_pool.draw(n_entities, rng=rng)
 
     # add two first names together (seperately for each gender)
-    men_double = [men_first_names[i] + " " + men_first_names[i + 1] for i in range(0, len(men_first_names), 2) if i + 1 < len(men_first_names)]
-    women_double = [women_first_names[i] + " " + women_first_names[i + 1] for i in range(0, len(women_first_names), 2) if i + 1 < len(women_first_names)]
+    men_double = [first + " " + second for first, second in zip(men_first_names[0::2], men_first_names[1::2])]
+    women_double = [first + " " + second for first, second in zip(women_first_names[0::2], women_first_names[1::2])]
 
     # combine 
-    double_first_names = list(men_double) + list(women_double)
+    double_first_names = men_double + women_double
     
-    return double_first_names, sampled_men_remaining, sampled_women_remaining
+    return double_first_names
 
-def get_first_name_initial(sampled_men, sampled_women, n_entities=26):
+def get_first_name_initial(men_pool, women_pool, n_entities=26, rng=np.random):
     '''
     Obtain entities that consist of a first name and an initial
     '''
-    # sample 13 ents from each gender
-    men_first_names = np.random.choice(sampled_men, size=n_entities//2, replace=False)
-    women_first_names = np.random.choice(sampled_women, size=n_entities//2, replace=False)
-
-    # combine the two lists
-    first_names = list(men_first_names) + list(women_first_names)
-
-    # obtain all names that have not been sampled
-    sampled_men_remaining = [name for name in sampled_men if name not in men_first_names]
-    sampled_women_remaining = [name for name in sampled_women if name not in women_first_names]
-    
-    # create a list of uppercase letters
-    uppercase_letters = list(string.ascii_uppercase)
-
-    # sample 26 initials
-    initials = np.random.choice(uppercase_letters, size=n_entities, replace=False)
+    # sample half of the first names from each gender
+    first_names = get_first_names(men_pool, women_pool, n_entities=n_entities, rng=rng)
 
-    # add a dot at the end of each initial
-    initials = [initial + "." for initial in initials]
+    # sample initials (all different)
+    initials = draw_initials(n_entities, replace=False, rng=rng)
 
     # combine the two lists
-    first_name_initial = []
+    first_name_initial = [first_name + " " + initial for first_name, initial in zip(first_names, initials)]
     
-    for first_name, initial in zip(first_names, initials):
-        first_name_initial.append(first_name + " " + initial)
+    return first_name_initial
     
-    return first_name_initial, sampled_men_remaining, sampled_women_remaining
-    
-    
-def get_double_last_name(sampled_men, sampled_women, sampled_last_names, n_entities=76): 
+def get_double_last_name(men_pool, women_pool, last_name_pool, n_entities=76, rng=np.random): 
     '''
     Obtain entities that consist of a first and double last_name
     '''
-    # sample 38 ents from each gender
-    men_first_names = np.random.choice(sampled_men, size=n_entities//2, replace=False)
-    women_first_names = np.random.choice(sampled_women, size=n_entities//2, replace=False)
+    # sample half of the first names from each gender
+    first_names = get_first_names(men_pool, women_pool, n_entities=n_entities, rng=rng)
 
-    # sample 76 last names
-    last_names = np.random.choice(sampled_last_names, size=n_entities*2, replace=False)
+    # sample two last names per entity
+    last_names = last_name_pool.draw(n_entities*2, rng=rng)
 
-    # obtain all names that have not been sampled
-    sampled_men_remaining = [name for name in sampled_men if name not in men_first_names]
-    sampled_women_remaining = [name for name in sampled_women if name not in women_first_names]
-    sampled_last_names_remaining = [name for name in sampled_last_names if name not in last_names]
-    
     # put two last names together
-    last_double = [last_names[i] + " " + last_names[i + 1] for i in range(0, len(last_names), 2) if i + 1 < len(last_names)]
-
-    # combine the two lists
-    first_names = list(men_first_names) + list(women_first_names)
-
-    first_double_last_names = []
+    last_double = [first + " " + second for first, second in zip(last_names[0::2], last_names[1::2])]
 
     # combine the two ents into one 
-    for first_name, last_name in zip(first_names, last_double):
-        first_double_last_names.append(first_name + " " + last_name)
-
-    return first_double_last_names, sampled_men_remaining, sampled_women_remaining, sampled_last_names_remaining
+    first_double_last_names = [first_name + " " + last_name for first_name, last_name in zip(first_names, last_double)]
 
+    return first_double_last_names
 
-def get_first_name_initial_last(sampled_men, sampled_women, sampled_last_names, n_entities=50):
+def get_first_name_initial_last(men_pool, women_pool, last_name_pool, n_entities=50, rng=np.random):
     '''
     Obtain entities consisting of a first name + initial + last name
     '''
+    # sample first names (half from each gender) and last names
+    first_names = get_first_names(men_pool, women_pool, n_entities=n_entities, rng=rng)
+    last_names = last_name_pool.draw(n_entities, rng=rng)
 
-    # sample 50 entities from both first names and last names
-    men_first_names = np.random.choice(sampled_men, size=n_entities//2, replace=False)
-    women_first_names = np.random.choice(sampled_women, size=n_entities//2, replace=False)
-    last_names = np.random.choice(sampled_last_names, size=n_entities, replace=False)
-
-    # obtain all names that have not been sampled
-    sampled_men_remaining = [name for name in sampled_men if name not in men_first_names]
-    sampled_women_remaining = [name for name in sampled_women if name not in women_first_names]
-    sampled_last_names_remaining = [name for name in sampled_last_names if name not in last_names]
-
-    # combine the two lists
-    first_names = list(men_first_names) + list(women_first_names)
-
-    # create a list of uppercase letters
-    uppercase_letters = list(string.ascii_uppercase)
-
-    # sample 26 initials
-    initials = np.random.choice(uppercase_letters, size=n_entities, replace=True)
-
-    # add a dot at the end of each initial
-    initials = [initial + "." for initial in initials]
+    # sample initials (may repeat)
+    initials = draw_initials(n_entities, replace=True, rng=rng)
 
     # combine the three lists
-    first_name_initial_last = []
-
-    for first_name, initial, last_name in zip(first_names, initials, last_names):
-        first_name_initial_last.append(first_name + " " + initial + " " + last_name)
-
-    return first_name_initial_last, sampled_men_remaining, sampled_women_remaining, sampled_last_names_remaining
+    first_name_initial_last = [first_name + " " + initial + " " + last_name for first_name, initial, last_name in zip(first_names, initials, last_names)]
 
+    return first_name_initial_last
 
-def main():
-    # set seed
-    np.random.seed(1209)
-
-    path = pathlib.Path(__file__)
-    names_path = path.parents[2] / "dbase" / "entities_lists" / "person_names"
+def create_person_df(names_path, famous_df):
+    '''
+    Create the PERSON entity list from the name tables (regular names) and the PERSON sheet of the manual lists (famous names).
 
+    Args
+        names_path: path to the folder with the name tables
+        famous_df: df with famous names (with weight and context columns)
+    '''
     # load the three lists
-    men_df, women_df, last_names_df = load_persons(names_path)
+    men_table, women_table, last_names_table = load_persons(names_path)
 
     # sample persons
-    sampled_men, sampled_women, sampled_last_names = sample_persons(men_df, women_df, last_names_df)
+    sampled_men, sampled_women, sampled_last_names = sample_persons(men_table, women_table, last_names_table)
+
+    # make pools to draw names from without replacement
+    men_pool, women_pool, last_name_pool = NamePool(sampled_men), NamePool(sampled_women), NamePool(sampled_last_names)
 
     # sample first names
-    first_names, sampled_men_remaining, sampled_women_remaining = get_first_names(sampled_men, sampled_women)
+    first_names = get_first_names(men_pool, women_pool)
 
     # sample last names
-    last_names, sampled_last_names_remaining = get_last_names(sampled_last_names)
+    last_names = get_last_names(last_name_pool)
 
     # sample first + last names
-    first_last_names, sampled_men_remaining, sampled_women_remaining, sampled_last_names_remaining = get_first_and_last_names(sampled_men_remaining, sampled_women_remaining, sampled_last_names_remaining)
+    first_last_names = get_first_and_last_names(men_pool, women_pool, last_name_pool)
 
     # sample first + first names
-    double_first_names, sampled_men_remaining, sampled_women_remaining = get_double_first_name(sampled_men_remaining, sampled_women_remaining)
+    double_first_names = get_double_first_name(men_pool, women_pool)
 
     # sample first + initial
-    first_name_initial, sampled_men_remaining, sampled_women_remaining = get_first_name_initial(sampled_men_remaining, sampled_women_remaining)
+    first_name_initial = get_first_name_initial(men_pool, women_pool)
 
     # sample first + last + last
-    double_last_names, sampled_men_remaining, sampled_women_remaining, sampled_last_names_remaining = get_double_last_name(sampled_men_remaining, sampled_women_remaining, sampled_last_names)
+    double_last_names = get_double_last_name(men_pool, women_pool, last_name_pool)
     
     # sample first + initial + last
-    first_name_initial_last, sampled_men_remaining, sampled_women_remaining, sampled_last_names_remaining = get_first_name_initial_last(sampled_men_remaining, sampled_women_remaining, sampled_last_names_remaining)
+    first_name_initial_last = get_first_name_initial_last(men_pool, women_pool, last_name_pool)
     
     # combine all lists
     all_names = []
@@ -370,10 +442,6 @@ def main():
     for lst in [first_names, last_names, first_last_names, double_first_names, double_last_names, first_name_initial, first_name_initial_last]:
         all_names.extend(lst)
 
-    # load famous names
-    ents_path = path.parents[2] / "dbase" / "entities_lists" 
-    famous_df= pd.read_excel(ents_path / "MANUAL_LISTS.xlsx", sheet_name="PERSON")
-
     # make all regular names into a dataframe, add weights and context col (to match other lists)
     df = pd.DataFrame(all_names, columns=["entity"])
     df["weight"] = 1
@@ -382,9 +450,23 @@ def main():
     # concat regular and famous names
     final_df = pd.concat([df, famous_df], ignore_index=True)
 
+    return final_df
+
+def main():
+    # set seed
+    np.random.seed(1209)
+
+    path = pathlib.Path(__file__)
+    ents_path = path.parents[2] / "dbase" / "entities_lists" 
+
+    # load famous names
+    famous_df = load_manual_lists(ents_path, sheet_names=["PERSON"])["PERSON"]
+
+    final_df = create_person_df(ents_path / "person_names", famous_df)
+
     # save to file
     final_df.to_csv(ents_path / "PERSON.csv", index=False)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
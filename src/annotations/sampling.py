@@ -0,0 +1,134 @@
+'''
+Weighted sampling of entities without physically repeating rows by their weight.
+'''
+import numpy as np
+
+class AliasSampler:
+    '''
+    Weighted sampler over a table of distinct entities using the alias method (Vose).
+
+    Memory is proportional to the number of distinct entities, not to the total weight.
+
+    Args
+        weights: array with a non-negative integer weight per entity (e.g., the weight column of the entity lists)
+    '''
+    def __init__(self, weights):
+        self.weights = np.asarray(weights, dtype=np.int64)
+
+        if (self.weights < 0).any():
+            raise ValueError("Weights must be non-negative")
+
+        if self.weights.sum() == 0:
+            raise ValueError("At least one weight must be positive")
+
+        self.prob, self.alias = build_alias_table(self.weights)
+
+    def __len__(self):
+        return len(self.weights)
+
+    @property
+    def total_weight(self):
+        return int(self.weights.sum())
+
+    def sample(self, size, rng=np.random):
+        '''
+        Draw entities with replacement in proportion to their weight.
+
+        Args
+            size: number of draws
+            rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+
+        Returns
+            indices: array with the position of the drawn entity for every draw
+        '''
+        # pick a column of the table uniformly and keep it or take its alias
+        u = rng.random(size) * len(self)
+        columns = u.astype(np.int64)
+        keep = (u - columns) < self.prob[columns]
+
+        return np.where(keep, columns, self.alias[columns])
+
+def build_alias_table(weights):
+    '''
+    Build the probability and alias tables for the alias method.
+
+    Args
+        weights: array with non-negative weights
+
+    Returns
+        prob: probability of keeping each column
+        alias: entity to use for each column when it is not kept
+    '''
+    n = len(weights)
+
+    # scale weights so that the average is 1 (as a list, since the loop below works on single elements)
+    scaled = (weights * n / weights.sum()).tolist()
+
+    prob = np.ones(n)
+    alias = np.arange(n)
+
+    small = [i for i, weight in enumerate(scaled) if weight < 1]
+    large = [i for i, weight in enumerate(scaled) if weight >= 1]
+
+    # pair every column that is too small with a column that has weight to spare
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+
+        prob[s] = scaled[s]
+        alias[s] = l
+
+        scaled[l] = scaled[l] + scaled[s] - 1
+
+        if scaled[l] < 1:
+            small.append(l)
+        else:
+            large.append(l)
+
+    # the columns left over are (up to rounding) full
+    for i in small + large:
+        prob[i] = 1
+
+    return prob, alias
+
+def weighted_sample(weights, size, replace=False, rng=np.random):
+    '''
+    Draw positions in proportion to (possibly non-integer) weights in one vectorized call.
+
+    Without replacement, every position gets an exponential key divided by its weight and the size smallest keys are drawn (Efraimidis-Spirakis),
+    which gives the same distribution as drawing one at a time and renormalizing the weights after every draw.
+    With replacement, uniform numbers are looked up in the cumulative weights.
+
+    Args
+        weights: array with non-negative weights
+        size: number of draws
+        replace: whether to draw with replacement
+        rng: random generator, e.g. from np.random.default_rng (defaults to np.random i.e., the global seed)
+
+    Returns
+        indices: array with the drawn positions (in the order they were drawn)
+    '''
+    weights = np.asarray(weights, dtype=np.float64)
+
+    if (weights < 0).any():
+        raise ValueError("Weights must be non-negative")
+
+    n_positive = int((weights > 0).sum())
+
+    if n_positive == 0:
+        raise ValueError("At least one weight must be positive")
+
+    if replace:
+        cumulative = np.cumsum(weights)
+        return np.searchsorted(cumulative, rng.random(size) * cumulative[-1], side="right")
+
+    if size > n_positive:
+        raise ValueError(f"Cannot draw {size} positions without replacement from {n_positive} positions with a positive weight")
+
+    # positions with a weight of zero get an infinite key and are never drawn
+    with np.errstate(divide="ignore"):
+        keys = -np.log(1 - rng.random(len(weights))) / weights
+
+    smallest = np.argpartition(keys, size - 1)[:size] if size else np.array([], dtype=np.int64)
+
+    return smallest[np.argsort(keys[smallest])]
@@ -1,28 +1,95 @@
+import hashlib
 import numpy as np
+import pandas as pd
+
+from danish_numbers import cardinal_words
+
+# small numbers that are written in words (2-19 and the tens up to 90)
+SMALL_NUMBERS = list(range(2, 20)) + list(range(20, 100, 10))
 
 def number_words():
     '''
-    Create list of numbers in words (danish) from pre-defined list of small numbers and big numbers.
+    Create list of numbers in words (danish) from the small numbers and 28 (distinct) combinations of a small number with hundrede, tusind or millioner.
     Utilized for multiple entities that all need numbers in front of a unit.
     '''
+    small_numbers = [cardinal_words(n) for n in SMALL_NUMBERS]
 
-    small_numbers = [
-        "to", "tre", "fire", "fem", "seks", "syv", "otte", "ni", "ti", "tolv", "tretten", "fjorten", "femten", "seksten", "sytten", "atten", "nitten",
-        "tyve", "tredive", "fyrre", "halvtreds", "tres", "firs", "halvfems", "halvfems", "halvfjerds", "firs", "halvfems"
-    ]
+    # e.g., 15 * 1000 -> "femten tusind" (distinct numbers only, as e.g. 80 * 100 and 8 * 1000 are both "otte tusind")
+    big_combined_nums = [cardinal_words(n) for n in sorted({n * scale for n in SMALL_NUMBERS for scale in [10**2, 10**3, 10**6]})]
 
-    big_numbers = ["hundrede", "tusinde", "millioner"]
+    # sample 28 big nums 
+    big_combined_numbers = np.random.choice(big_combined_nums, size=28, replace=False)
 
-    big_combined_nums = []
+    # combine with small nums 
+    all_numbers = np.concatenate([small_numbers, big_combined_numbers])
 
-    for num in small_numbers: 
-        for big_num in big_numbers: 
-            big_combined_nums.append(f"{num} {big_num}")
+    return all_numbers
 
-    # sample 30 big nums 
-    big_combined_numbers = np.random.choice(big_combined_nums, size=28)
+def file_hash(path):
+    '''
+    Compute the sha256 hash of the content of a file.
+    '''
+    sha = hashlib.sha256()
 
-    # combine with small nums 
-    all_numbers = np.concatenate([small_numbers, big_combined_numbers])
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+
+    return sha.hexdigest()
+
+def load_manual_lists(data_path, sheet_names=None, workbook="MANUAL_LISTS.xlsx"):
+    '''
+    Load sheets of the manual entity lists workbook.
+
+    All sheets are parsed in a single pass and cached as feather files in data_path / ".cache", keyed by the hash of the workbook.
+    Later calls read the cache (skipping openpyxl entirely) until the workbook changes.
+
+    Args
+        data_path: path to folder with the workbook
+        sheet_names: list of sheets to return (defaults to None i.e., all sheets)
+        workbook: file name of the workbook
+
+    Returns
+        sheets: dict with sheet name as key and df as value
+    '''
+    workbook_path = data_path / workbook
+
+    # define cache folder for this version of the workbook
+    cache_path = data_path / ".cache" / f"{workbook_path.stem}_{file_hash(workbook_path)[:16]}"
+
+    # parse the workbook once and write all sheets to the cache if it does not exist
+    if not cache_path.exists():
+        sheets = pd.read_excel(workbook_path, sheet_name=None)
+        write_sheet_cache(sheets, cache_path)
+    else:
+        sheets = None
+
+    if sheet_names is None:
+        sheet_names = [path.stem for path in sorted(cache_path.glob("*.feather"))] if sheets is None else list(sheets)
+
+    # read requested sheets (from the cache unless we just parsed the workbook)
+    if sheets is None:
+        return {name: pd.read_feather(cache_path / f"{name}.feather") for name in sheet_names}
+
+    return {name: sheets[name] for name in sheet_names}
+
+def write_sheet_cache(sheets, cache_path):
+    '''
+    Write a dict of dfs to feather files in cache_path (one file per sheet). Caches of older versions of the workbook are removed.
+    '''
+    # remove caches for older versions of the workbook
+    prefix = cache_path.name.rsplit("_", 1)[0]
+
+    for old_path in cache_path.parent.glob(f"{prefix}_*"):
+        for file in old_path.glob("*.feather"):
+            file.unlink()
+        old_path.rmdir()
+
+    # write to a temporary folder first so that an interrupted write does not leave a partial cache
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    tmp_path.mkdir(parents=True, exist_ok=True)
+
+    for name, df in sheets.items():
+        df.to_feather(tmp_path / f"{name}.feather")
 
-    return all_numbers
\ No newline at end of file
+    tmp_path.rename(cache_path)
@@ -0,0 +1,225 @@
+'''
+Stream annotation lists to JSONL or Parquet in chunks.
+
+A manifest next to the output file records how many examples have been written, so that an interrupted run can be resumed.
+'''
+import json
+import os
+import pathlib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# schema of one annotation list (example)
+ENTITY_TYPE = pa.struct([("label", pa.string()), ("entity", pa.string()), ("context", pa.string()), ("source", pa.string())])
+SCHEMA = pa.schema([("id", pa.int64()), ("entities", pa.list_(ENTITY_TYPE))])
+
+def df_to_records(df):
+    '''
+    Convert a df of entities into one record per example.
+
+    Args
+        df: df with entity, context, TYPE and example columns (ordered by example) and optionally a source column
+
+    Returns
+        records: list of dicts, e.g. {"id": 0, "entities": [{"label": "PERSON", "entity": "Nina Bang", "context": None, "source": "PERSON.csv"}]}
+    '''
+    labels = df["TYPE"].tolist()
+    entities = df["entity"].astype(str).tolist()
+    contexts = df["context"].astype(object).where(df["context"].notna(), None).tolist()
+    sources = df["source"].tolist() if "source" in df.columns else [None] * len(df)
+
+    records = []
+
+    for i, example in enumerate(df["example"].tolist()):
+        # start a new record when we reach a new example
+        if not records or records[-1]["id"] != example:
+            records.append({"id": example, "entities": []})
+
+        records[-1]["entities"].append({"label": labels[i], "entity": entities[i], "context": contexts[i], "source": sources[i]})
+
+    return records
+
+def format_record(record):
+    '''
+    Format the entities of a record as in the original annotation lists, e.g. ["EVENT: 11. september {terror attack}", "GPE: Berlin"].
+    '''
+    formatted = []
+
+    for ent in record["entities"]:
+        if ent["context"] is None:
+            formatted.append(f"{ent['label']}: {ent['entity']}")
+        else:
+            formatted.append(f"{ent['label']}: {ent['entity']} {{{ent['context']}}}")
+
+    return formatted
+
+def manifest_path(path):
+    '''
+    Path of the manifest belonging to an annotation file (e.g., annotations.jsonl -> annotations.jsonl.manifest.json).
+    '''
+    return path.with_name(f"{path.name}.manifest.json")
+
+def read_manifest(path):
+    '''
+    Read the manifest of an annotation file. Returns None if there is no manifest.
+    '''
+    if not manifest_path(path).exists():
+        return None
+
+    with open(manifest_path(path)) as f:
+        return json.load(f)
+
+class AnnotationWriter:
+    '''
+    Append annotation lists in chunks to a JSONL file or a folder of Parquet files.
+
+    After every chunk, the manifest is updated with the number of examples (and bytes or parts) written.
+    With resume=True, writing continues after the last complete chunk and anything written after it is discarded.
+
+    Args
+        path: output path. The format is given by the suffix (.jsonl or .parquet, the latter is a folder with one file per chunk)
+        resume: whether to continue from the manifest of an earlier run
+        params: dict with the parameters of the run (e.g., seed). A run can only be resumed with the same params.
+    '''
+    def __init__(self, path, resume=False, params=None):
+        self.path = pathlib.Path(path)
+        self.format = self.path.suffix.lstrip(".")
+        self.params = params or {}
+
+        if self.format not in ["jsonl", "parquet"]:
+            raise ValueError(f"Unknown format '{self.format}'. Use a .jsonl or .parquet path")
+
+        manifest = read_manifest(self.path) if resume else None
+
+        if manifest is not None and manifest["params"] != self.params:
+            raise ValueError(f"Cannot resume {self.path} with params {self.params} (it was written with {manifest['params']})")
+
+        # start from scratch
+        if manifest is None:
+            manifest = {"format": self.format, "params": self.params, "n_examples": 0, "bytes": 0, "parts": [], "complete": False}
+            self._remove_output()
+
+        self.manifest = manifest
+        self._discard_uncommitted()
+
+    @property
+    def n_written(self):
+        return self.manifest["n_examples"]
+
+    @property
+    def complete(self):
+        return self.manifest["complete"]
+
+    def write(self, records):
+        '''
+        Write a chunk of records and update the manifest.
+        '''
+        if not records:
+            return
+
+        if self.format == "jsonl":
+            with open(self.path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.manifest["bytes"] = self.path.stat().st_size
+
+        else:
+            self.path.mkdir(parents=True, exist_ok=True)
+            part = f"part-{len(self.manifest['parts']):05d}.parquet"
+            pq.write_table(pa.Table.from_pylist(records, schema=SCHEMA), self.path / part)
+            self.manifest["parts"].append(part)
+
+        self.manifest["n_examples"] += len(records)
+        self._write_manifest()
+
+    def close(self):
+        '''
+        Mark the output as complete.
+        '''
+        self.manifest["complete"] = True
+        self._write_manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # only mark as complete if no error occurred (so that the run can be resumed)
+        if exc_type is None:
+            self.close()
+
+    def _write_manifest(self):
+        # write to a temporary file first so that the manifest is never half written
+        tmp_path = manifest_path(self.path).with_suffix(".tmp")
+
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+
+        os.replace(tmp_path, manifest_path(self.path))
+
+    def _remove_output(self):
+        if self.path.is_dir():
+            for part in self.path.glob("*.parquet"):
+                part.unlink()
+        elif self.path.exists():
+            self.path.unlink()
+
+    def _discard_uncommitted(self):
+        # remove anything written after the last chunk in the manifest (e.g., if a run was interrupted mid-chunk)
+        if self.format == "jsonl":
+            if self.path.exists():
+                with open(self.path, "r+b") as f:
+                    f.truncate(self.manifest["bytes"])
+        elif self.path.is_dir():
+            for part in self.path.glob("*.parquet"):
+                if part.name not in self.manifest["parts"]:
+                    part.unlink()
+
+def read_records(path):
+    '''
+    Read all complete chunks of records written with AnnotationWriter.
+
+    Args
+        path: path to the .jsonl file or .parquet folder
+
+    Returns
+        records: list of dicts (see df_to_records)
+    '''
+    path = pathlib.Path(path)
+    manifest = read_manifest(path)
+
+    if path.suffix == ".jsonl":
+        with open(path, "rb") as f:
+            data = f.read(manifest["bytes"] if manifest else -1)
+        return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+    parts = manifest["parts"] if manifest else sorted(part.name for part in path.glob("*.parquet"))
+
+    if not parts:
+        return []
+
+    return pa.concat_tables([pq.read_table(path / part, schema=SCHEMA) for part in parts]).to_pylist()
+
+def export_excel(path, outpath):
+    '''
+    Export records to annotations.xlsx in outpath (each example is a row with its formatted entities).
+    '''
+    examples = [format_record(record) for record in read_records(path)]
+
+    df = pd.DataFrame({"entities": examples})
+
+    df.to_excel(outpath / "annotations.xlsx", index=True)
+
+    print("Done writing to excel file.")
+
+def export_txt(path, outpath):
+    '''
+    Export records to annotations.txt in outpath (each example is a line with its formatted entities).
+    '''
+    with open(outpath / "annotations.txt", "w") as f:
+        for record in read_records(path):
+            f.write(f"{format_record(record)}\n")
+
+    print("Done writing to txt file.")
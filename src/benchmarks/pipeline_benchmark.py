@@ -0,0 +1,230 @@
+'''
+Benchmark the steps of the annotation list pipeline (create_annotations.py) on synthetic entity pools.
+
+Every step is timed and memory profiled (peak memory allocated with tracemalloc) for pools of increasing size and share of MULTIPLE rows.
+Results are saved as json. With --baseline, the timings are compared to an earlier result and the script fails if a step got slower.
+'''
+import argparse
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).parents[1] / "annotations"))
+from create_annotations import load_data, update_weights, expand_data, generate_posessives, shuffle_df, partition_sizes, index_multiples, fix_multiples, create_examples, MANUAL_TYPES
+from entity_store import CODED_TYPES
+
+def synthetic_entities(n_rows, prefix, rng):
+    '''
+    Create a df of n_rows synthetic entities with weights (1-3) and context (10% of the entities).
+    '''
+    df = pd.DataFrame({
+        "entity": [f"{prefix} {i}" for i in range(n_rows)],
+        "weight": rng.choice([1, 2, 3], size=n_rows, p=[0.8, 0.15, 0.05]),
+        "context": np.where(rng.random(n_rows) < 0.1, "context", None),
+    })
+
+    return df
+
+def synthetic_multiples(n_rows, rng):
+    '''
+    Create a df of n_rows synthetic multiples (e.g., "Volkswagen Golf" -> "Volkswagen" (ORGANIZATION) and "Golf" (PRODUCT)).
+    '''
+    df = synthetic_entities(n_rows, "multiple", rng)
+    df["entity_1"] = [f"first {i}" for i in range(n_rows)]
+    df["entity_2"] = [f"second {i}" for i in range(n_rows)]
+    df["type_1"] = "ORGANIZATION"
+    df["type_2"] = "PRODUCT"
+
+    return df
+
+def write_synthetic_lists(data_path, n_rows, multiple_ratio, max_sheet_rows=2000, seed=1209):
+    '''
+    Write synthetic entity lists with n_rows distinct entities to data_path (in the same layout as dbase/entities_lists).
+
+    The rows are split evenly over all entity types, but sheets in MANUAL_LISTS.xlsx are capped at max_sheet_rows (writing large workbooks is slow),
+    and the remaining rows are put in the coded csv files.
+    '''
+    rng = np.random.default_rng(seed)
+
+    n_multiple = int(n_rows * multiple_ratio)
+    n_per_type = (n_rows - n_multiple) // (len(MANUAL_TYPES) + len(CODED_TYPES))
+    n_per_sheet = min(n_per_type, max_sheet_rows)
+    n_per_csv = (n_rows - n_multiple - n_per_sheet * len(MANUAL_TYPES)) // len(CODED_TYPES)
+
+    with pd.ExcelWriter(data_path / "MANUAL_LISTS.xlsx") as writer:
+        synthetic_multiples(min(n_multiple, max_sheet_rows), rng).to_excel(writer, sheet_name="MULTIPLE", index=False)
+
+        for ent_type in MANUAL_TYPES:
+            synthetic_entities(n_per_sheet, ent_type, rng).to_excel(writer, sheet_name=ent_type, index=False)
+
+    for ent_type in CODED_TYPES:
+        synthetic_entities(n_per_csv, ent_type, rng).to_csv(data_path / f"{ent_type}.csv", index=False)
+
+def synthetic_pool(n_rows, multiple_ratio, seed=1209):
+    '''
+    Create a synthetic (unexpanded) pool of n_rows entities where a share (multiple_ratio) of the rows are MULTIPLE, as returned by load_data.
+    '''
+    rng = np.random.default_rng(seed)
+
+    n_multiple = int(n_rows * multiple_ratio)
+    types = rng.choice(MANUAL_TYPES + CODED_TYPES, size=n_rows - n_multiple)
+
+    df_all = synthetic_entities(n_rows - n_multiple, "entity", rng)
+    df_all["TYPE"] = types
+    df_all["source"] = [f"{ent_type}.csv" for ent_type in types]
+
+    multiple = synthetic_multiples(n_multiple, rng)
+    multiple["TYPE"] = "MULTIPLE"
+    multiple["source"] = "MANUAL_LISTS.xlsx:MULTIPLE"
+
+    df_all = pd.concat([df_all, multiple[["entity", "weight", "context", "TYPE", "source"]]], ignore_index=True)
+
+    return df_all, multiple
+
+def define_steps(data_path, df_all, multiple):
+    '''
+    Define the steps to benchmark. Every step is a function without arguments that runs on a fresh copy of its input.
+    '''
+    # prepare the input of every step by running the steps before it
+    df_weighted = update_weights(df_all.copy())
+    df_expanded = expand_data(df_weighted.copy())
+    df_posessives = generate_posessives(df_expanded.copy())
+    df_shuffled = shuffle_df(df_posessives)
+    sizes = partition_sizes(len(df_shuffled))
+    df_shuffled["example"] = np.repeat(np.arange(len(sizes)), sizes)
+    multiple_index = index_multiples(multiple)
+
+    steps = {
+        "load_data": lambda: load_data(data_path),
+        "update_weights": lambda: update_weights(df_all.copy()),
+        "expand_data": lambda: expand_data(df_weighted.copy()),
+        "generate_posessives": lambda: generate_posessives(df_expanded.copy()),
+        "shuffle_df": lambda: shuffle_df(df_posessives),
+        "fix_multiples": lambda: fix_multiples(df_shuffled, multiple_index),
+        "create_examples": lambda: create_examples(df_posessives.copy(), multiple),
+    }
+
+    return steps
+
+def run_step(step, repeats):
+    '''
+    Time a step (best of repeats) and measure its peak memory (in a separate run, as tracemalloc slows down the step).
+
+    Returns
+        seconds: best time in seconds
+        peak_mb: peak memory allocated during the step in MB
+    '''
+    times = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        step()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    step()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), peak / 1024**2
+
+def compare_to_baseline(results, baseline_path, tolerance):
+    '''
+    Compare timings to a baseline result. Returns the list of (n_rows, multiple_ratio, step) that are slower than baseline * tolerance.
+    '''
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    baseline_times = {(r["n_rows"], r["multiple_ratio"], r["step"]): r["seconds"] for r in baseline["results"]}
+
+    regressions = []
+
+    for r in results:
+        key = (r["n_rows"], r["multiple_ratio"], r["step"])
+
+        # ignore very fast steps (timing noise dominates)
+        if key in baseline_times and r["seconds"] > 0.01 and r["seconds"] > baseline_times[key] * tolerance:
+            regressions.append(key)
+            print(f"[REGRESSION:] {r['step']} on {r['n_rows']} rows (multiple ratio {r['multiple_ratio']}): {r['seconds']:.3f} s vs {baseline_times[key]:.3f} s")
+
+    return regressions
+
+def input_parse():
+    '''
+    Parse command line arguments.
+    '''
+    path = pathlib.Path(__file__)
+
+    parser = argparse.ArgumentParser(description="Benchmark the steps of the annotation list pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000], help="number of distinct entities in the synthetic pools")
+    parser.add_argument("--multiple_ratios", type=float, nargs="+", default=[0.02, 0.1], help="shares of MULTIPLE rows in the synthetic pools")
+    parser.add_argument("--repeats", type=int, default=3, help="number of times each step is timed (the best time is kept)")
+    parser.add_argument("--outfile", type=pathlib.Path, default=path.parents[2] / "results" / "benchmarks" / "pipeline_benchmark.json", help="where to save the results")
+    parser.add_argument("--baseline", type=pathlib.Path, default=None, help="earlier results to compare to")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="how many times slower than the baseline a step may be")
+
+    return parser.parse_args()
+
+def main():
+    args = input_parse()
+
+    np.random.seed(1209)
+
+    results = []
+
+    for n_rows in args.sizes:
+        for multiple_ratio in args.multiple_ratios:
+            print(f"[INFO:] Benchmarking {n_rows} entities with multiple ratio {multiple_ratio} ...")
+
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                data_path = pathlib.Path(tmp_dir)
+                write_synthetic_lists(data_path, n_rows, multiple_ratio)
+
+                df_all, multiple = synthetic_pool(n_rows, multiple_ratio)
+                steps = define_steps(data_path, df_all, multiple)
+
+                # warm up the cache of MANUAL_LISTS.xlsx so that load_data is timed as in later runs
+                load_data(data_path)
+
+                for step_name, step in steps.items():
+                    seconds, peak_mb = run_step(step, args.repeats)
+                    results.append({"n_rows": n_rows, "multiple_ratio": multiple_ratio, "step": step_name, "seconds": round(seconds, 5), "peak_mb": round(peak_mb, 2)})
+
+    # print results as a table (steps x sizes)
+    df_results = pd.DataFrame(results)
+    print(df_results.pivot_table(index=["step"], columns=["n_rows", "multiple_ratio"], values="seconds", sort=False).to_string())
+
+    # save results with information about the machine
+    output = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "results": results,
+    }
+
+    args.outfile.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(args.outfile, "w") as f:
+        json.dump(output, f, indent=2)
+
+    print(f"[INFO:] Results saved to {args.outfile}")
+
+    # fail if any step is slower than the baseline
+    if args.baseline is not None:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
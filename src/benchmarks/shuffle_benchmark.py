@@ -0,0 +1,91 @@
+'''
+Benchmark the constructive shuffle_df against the previous reshuffle-until-valid loop for increasing shares of MULTIPLE rows.
+'''
+import pathlib
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).parents[1] / "annotations"))
+from create_annotations import shuffle_df
+
+def shuffle_df_retry(df, max_attempts=1000):
+    '''
+    Previous implementation of shuffle_df: reshuffle the whole df until no two MULTIPLE rows are next to each other.
+
+    Args
+        df: df with a TYPE column
+        max_attempts: number of reshuffles before giving up
+
+    Returns
+        df: shuffled df (None if no valid order was found within max_attempts)
+        attempts: number of reshuffles used
+    '''
+    for attempt in range(1, max_attempts + 1):
+        # shuffle df
+        df = df.sample(frac=1).reset_index(drop=True)
+
+        # get indices of MULTIPLE
+        multiple_indices = df[df["TYPE"] == "MULTIPLE"].index
+
+        # check if any of the MULTIPLE indices are next to each other
+        if all(multiple_indices[i+1] - multiple_indices[i] != 1 for i in range(len(multiple_indices)-1)):
+            return df, attempt
+
+    return None, max_attempts
+
+def synthetic_pool(n_rows, multiple_ratio):
+    '''
+    Create a df of n_rows entities where a share (multiple_ratio) of the rows are MULTIPLE.
+    '''
+    n_multiple = int(n_rows * multiple_ratio)
+
+    df = pd.DataFrame({
+        "entity": [f"entity_{i}" for i in range(n_rows)],
+        "context": np.nan,
+        "TYPE": ["MULTIPLE"] * n_multiple + ["GPE"] * (n_rows - n_multiple),
+    })
+
+    return df
+
+def time_call(func, *args):
+    '''
+    Time a single call of func with args. Returns the output and the elapsed time in seconds.
+    '''
+    start = time.perf_counter()
+    output = func(*args)
+    elapsed = time.perf_counter() - start
+
+    return output, elapsed
+
+def main():
+    np.random.seed(1209)
+
+    # pool sizes and shares of MULTIPLE rows to benchmark
+    n_rows_list = [3000, 30000]
+    multiple_ratios = [0.005, 0.01, 0.02, 0.05, 0.1]
+
+    results = []
+
+    for n_rows in n_rows_list:
+        for multiple_ratio in multiple_ratios:
+            df = synthetic_pool(n_rows, multiple_ratio)
+
+            # time both versions
+            _, constructive_time = time_call(shuffle_df, df)
+            (shuffled, attempts), retry_time = time_call(shuffle_df_retry, df)
+
+            results.append({
+                "n_rows": n_rows,
+                "multiple_ratio": multiple_ratio,
+                "constructive_s": round(constructive_time, 4),
+                "retry_s": round(retry_time, 4),
+                "retry_attempts": attempts,
+                "retry_succeeded": shuffled is not None,
+            })
+
+    print(pd.DataFrame(results).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
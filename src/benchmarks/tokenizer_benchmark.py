@@ -0,0 +1,90 @@
+'''
+Benchmark token offsets from batched tokenization (prepare_data.token_offsets) against the previous path,
+which created a Doc per text with df.apply and read the token offsets from the Docs.
+
+Texts are the generations in dbase/annotations/annotations_w_generations.xlsx, repeated to the benchmarked sizes.
+'''
+import argparse
+import pathlib
+import sys
+import time
+import numpy as np
+import pandas as pd
+import spacy
+
+sys.path.append(str(pathlib.Path(__file__).parents[1]))
+from prepare_data import token_offsets, worker_pool
+
+def apply_offsets(df, nlp, textcol="sentences"):
+    '''
+    Previous implementation: convert every text to a Doc with df.apply and read the token offsets from the Docs.
+
+    Returns
+        tokens: list with a list of {"id": ..., "start": ..., "end": ...} dicts for every text
+    '''
+    docs = df[textcol].apply(lambda x: nlp(x))
+
+    return [[{"id": idx, "start": token.idx, "end": token.idx + len(token.text)} for idx, token in enumerate(doc)] for doc in docs]
+
+def best_time(func, repeats, *args, **kwargs):
+    '''
+    Time func repeats times. Returns the output of the last call and the best time in seconds.
+    '''
+    times = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+
+    return output, min(times)
+
+def input_parse():
+    '''
+    Parse command line arguments.
+    '''
+    path = pathlib.Path(__file__)
+
+    parser = argparse.ArgumentParser(description="Benchmark batched tokenization against Doc creation with apply.")
+    parser.add_argument("--data", type=pathlib.Path, default=path.parents[2] / "dbase" / "annotations" / "annotations_w_generations.xlsx", help="workbook with the generations")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[6000, 60000], help="number of texts to tokenize")
+    parser.add_argument("--n_process", type=int, nargs="+", default=[1, 2], help="numbers of processes to run token_offsets with")
+    parser.add_argument("--repeats", type=int, default=3, help="number of times each path is timed (the best time is kept)")
+
+    return parser.parse_args()
+
+def main():
+    args = input_parse()
+
+    texts = pd.concat([pd.read_excel(args.data, sheet_name=sheet)["sentences"] for sheet in ["ENTS", "NO ENTS"]]).tolist()
+    nlp = spacy.blank("da")
+
+    results = []
+
+    for size in args.sizes:
+        df = pd.DataFrame({"sentences": np.resize(np.array(texts, dtype=object), size)})
+        print(f"[INFO:] Benchmarking {size} texts ...")
+
+        tokens, apply_time = best_time(apply_offsets, args.repeats, df, nlp)
+        n_tokens = sum(len(doc_tokens) for doc_tokens in tokens)
+        results.append({"n_texts": size, "path": "apply", "seconds": round(apply_time, 3), "tokens_per_s": round(n_tokens / apply_time)})
+
+        for n_process in args.n_process:
+            # start the pool before timing (as in prepare_data, where one pool is kept for the whole run)
+            with worker_pool(n_process) as executor:
+                list(executor.map(abs, range(n_process)))
+                (starts, ends, indptr), batched_time = best_time(token_offsets, args.repeats, df["sentences"].tolist(), nlp=nlp, n_process=n_process, executor=executor)
+
+            # check that both paths give the same offsets
+            if starts.tolist() != [token["start"] for doc_tokens in tokens for token in doc_tokens] or ends.tolist() != [token["end"] for doc_tokens in tokens for token in doc_tokens]:
+                raise ValueError(f"token_offsets with {n_process} processes differs from the apply path")
+
+            results.append({"n_texts": size, "path": f"token_offsets (n_process={n_process})", "seconds": round(batched_time, 3), "tokens_per_s": round(n_tokens / batched_time)})
+
+    df_results = pd.DataFrame(results)
+    df_results["speedup"] = (df_results["tokens_per_s"] / df_results.groupby("n_texts")["tokens_per_s"].transform("first")).round(2)
+
+    print(df_results.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
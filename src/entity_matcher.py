@@ -0,0 +1,203 @@
+'''
+Locate entities in sentences with one Aho-Corasick automaton per batch of sentences (used by prepare_data.create_ents).
+
+All entity strings of a batch are compiled into one automaton, which finds every occurrence of every entity in a sentence in a single scan.
+The occurrences are then filtered with the boundary rules of each entity (see boundary_rule), which are the same as the regex patterns
+that were previously built for every entity.
+'''
+
+def is_word_char(char):
+    '''
+    Whether a character is matched by \\w in a (unicode) regex.
+    '''
+    return char.isalnum() or char == "_"
+
+def boundary_rule(ent, label):
+    '''
+    Get the boundary rule of an entity.
+
+    Returns
+        leading_boundary: whether the entity has to start at a word boundary (\\b)
+        trailing_char: whether the entity has to be followed by one more character (ORDINAL ending with a dot), which is not part of the span.
+            Otherwise, the entity must not be followed by a word character.
+    '''
+    # entities with special characters only need to be followed by a non-word character
+    if label == "PERCENT" and "%" in ent:
+        return False, False
+    elif label == "ORDINAL" and ent.endswith("."):
+        return False, True
+    elif label == "MONEY" and (ent.endswith(".") or any(not (char.isascii() and char.isalnum()) and not char.isspace() for char in ent)):
+        return False, False
+    elif label == "PERSON" and ent.endswith("."):
+        return False, False
+    elif ent.startswith("@") or "(" in ent or ")" in ent or label == "LAW" or "+" in ent or "'" in ent:
+        return False, False
+
+    # general case (including CARDINAL)
+    return True, False
+
+class Automaton:
+    '''
+    Aho-Corasick automaton over a set of strings.
+
+    Args
+        patterns: list of (unique, non-empty) strings
+    '''
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+
+        # trie with a dict of transitions per node and the pattern ids ending at each node
+        self.goto = [{}]
+        self.output = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            node = 0
+
+            for char in pattern:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.output.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+
+            self.output[node].append(pattern_id)
+
+        # failure links (breadth first, so the failure link of a node's parent is known before the node)
+        self.fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+
+        for node in queue:
+            for char, child in self.goto[node].items():
+                fail = self.fail[node]
+
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+
+                self.fail[child] = self.goto[fail].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+                queue.append(child)
+
+    def find(self, text):
+        '''
+        Find all (also overlapping) occurrences of the patterns in text.
+
+        Returns
+            occurrences: list of (start, end, pattern_id) in order of end
+        '''
+        occurrences = []
+        node = 0
+
+        for i, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+
+            node = self.goto[node].get(char, 0)
+
+            for pattern_id in self.output[node]:
+                occurrences.append((i + 1 - len(self.patterns[pattern_id]), i + 1, pattern_id))
+
+        return occurrences
+
+class EntityMatcher:
+    '''
+    Locate the entities of a batch of sentences.
+
+    Entities are matched case-sensitively. If none of the entities of a sentence are found, they are matched again case-insensitively
+    with a second (lowercased) automaton.
+
+    Args
+        entity_lists: list with a list of {"entity": ..., "label": ...} dicts for every sentence in the batch
+    '''
+    def __init__(self, entity_lists):
+        ents = sorted({ent["entity"] for ents in entity_lists for ent in ents if ent["entity"]})
+        self.automaton = Automaton(ents)
+        self.ids = {ent: i for i, ent in enumerate(ents)}
+
+        lower_ents = sorted({ent.lower() for ent in ents})
+        self.lower_automaton = Automaton(lower_ents)
+        self.lower_ids = {ent: i for i, ent in enumerate(lower_ents)}
+
+    def match(self, sentence, ents):
+        '''
+        Locate the entities of one sentence.
+
+        Args
+            sentence: text of the sentence
+            ents: list of {"entity": ..., "label": ...} dicts
+
+        Returns
+            spans: list of {"start": ..., "end": ..., "label": ...} dicts (in the order of ents)
+        '''
+        spans = find_spans(sentence, ents, self.automaton, self.ids)
+
+        # search again but ignore case (skipped if lowercasing changes the length of the text, as the offsets would not fit)
+        if not spans and ents:
+            lower_sentence = sentence.lower()
+
+            if len(lower_sentence) == len(sentence):
+                lower_ents = [{"entity": ent["entity"].lower(), "label": ent["label"]} for ent in ents]
+                spans = find_spans(lower_sentence, lower_ents, self.lower_automaton, self.lower_ids, original=sentence)
+
+        return spans
+
+def find_spans(sentence, ents, automaton, ids, original=None):
+    '''
+    Scan a sentence with an automaton and keep the occurrences of ents that meet their boundary rules.
+
+    Matches of the same entity do not overlap (as with re.finditer), and quotes around a match are included in its span.
+
+    Args
+        sentence: text to scan (lowercased for the case-insensitive automaton)
+        ents: list of {"entity": ..., "label": ...} dicts
+        automaton: Automaton with (at least) the entities of ents
+        ids: dict from entity to its pattern id in automaton
+        original: the original text (to check boundaries and quotes in), defaults to sentence
+
+    Returns
+        spans: list of {"start": ..., "end": ..., "label": ...} dicts
+    '''
+    original = sentence if original is None else original
+
+    # occurrences of the entities of this sentence
+    wanted = {ids[ent["entity"]] for ent in ents if ent["entity"] in ids}
+    occurrences = {}
+
+    for start, end, pattern_id in automaton.find(sentence):
+        if pattern_id in wanted:
+            occurrences.setdefault(pattern_id, []).append((start, end))
+
+    spans = []
+
+    for ent in ents:
+        if ent["entity"] not in ids:
+            continue
+
+        leading_boundary, trailing_char = boundary_rule(ent["entity"], ent["label"])
+        last_end = 0
+
+        for start, end in sorted(occurrences.get(ids[ent["entity"]], [])):
+            if start < last_end:
+                continue
+
+            if leading_boundary and is_word_char(original[start - 1] if start > 0 else " ") == is_word_char(original[start]):
+                continue
+
+            # the entity has to be followed by any character but a newline (which is matched, but not part of the span)
+            if trailing_char:
+                if end >= len(original) or original[end] == "\n":
+                    continue
+                match_end = end + 1
+            elif end < len(original) and is_word_char(original[end]):
+                continue
+            else:
+                match_end = end
+
+            last_end = match_end
+
+            # include quotes around the match in the span
+            if original[start - 1:start] in ['"', "'"] and original[match_end:match_end + 1] in ['"', "'"]:
+                start, match_end = start - 1, match_end + 1
+
+            spans.append({"start": start, "end": match_end - 1 if trailing_char else match_end, "label": ent["label"]})
+
+    return spans
@@ -1,223 +1,356 @@
 '''
 Prepare dataset with true labels 
 '''
+import argparse
 import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import numpy as np
 import pandas as pd
 import spacy
-import re
+from openpyxl import load_workbook
 
-def convert_to_doc(df, textcol="sentences"):
+from entity_matcher import EntityMatcher
+from records import SPAN_FIELDS, SpanArrays, CorpusWriter, parse_entities, write_records
+
+# blank spacy model of a worker process (loaded once per worker by init_worker)
+_worker_nlp = None
+
+def init_worker(lang="da"):
     '''
-    Convert text from text column into spacy doc objects. Save to 'doc' column.
+    Load a blank spacy model in a worker process.
     '''
-    print("Loading blank spaCy model...")
-    nlp = spacy.blank("da")
+    global _worker_nlp
+    _worker_nlp = spacy.blank(lang)
 
-    df['doc'] = df[textcol].apply(lambda x: nlp(x))
+def worker_pool(n_workers, lang="da"):
+    '''
+    Create a pool of processes that each load a blank spacy model once (so the model is never sent to the workers with the tasks).
+    The pool is meant to be kept alive for a whole run and passed to token_offsets (or label_sharded).
+    '''
+    return ProcessPoolExecutor(max_workers=n_workers, initializer=init_worker, initargs=(lang,))
 
-    return df
+def _offsets_shard(texts, batch_size=1000):
+    '''
+    Tokenize a shard of texts in a worker process (see _offsets_batch).
+    '''
+    return _offsets_batch(texts, _worker_nlp.tokenizer, batch_size=batch_size)
 
-def create_sents(df):
+def _offsets_batch(texts, tokenizer, batch_size=1000):
     '''
-    Create sents column for dataframe with a spacy doc column
+    Tokenize a batch of texts and return the start and end offsets of all tokens (concatenated) and the number of tokens per text.
     '''
-    sents = []
+    starts, lengths, n_tokens = [], [], []
 
-    for i in range(len(df)):
-        # get doc object
-        doc = df['doc'][i]
-        
-        # create sentences
-        sent = [{"start": 0, "end": len(doc.text)}]
+    for doc in tokenizer.pipe(texts, batch_size=batch_size):
+        offsets = doc.to_array(["IDX", "LENGTH"])
+        starts.append(offsets[:, 0])
+        lengths.append(offsets[:, 1])
+        n_tokens.append(len(doc))
 
-        # append to list
-        sents.append(sent)
-    
-    # add to dataframe
-    df['sents'] = sents
+    starts = np.concatenate(starts).astype(np.int32) if starts else np.empty(0, dtype=np.int32)
+    ends = starts + (np.concatenate(lengths).astype(np.int32) if lengths else np.empty(0, dtype=np.int32))
 
-    return df
+    return starts, ends, np.array(n_tokens, dtype=np.int32)
 
-def create_tokens(df):
+def token_offsets(texts, nlp=None, batch_size=1000, n_process=1, executor=None):
     '''
-    Create tokens column for dataframe with a spacy doc column
+    Tokenize texts with the tokenizer of nlp (no Doc objects are kept) and return the token offsets as flat arrays.
+
+    Args
+        texts: list of texts
+        nlp: spacy pipeline to take the tokenizer from (defaults to None i.e., load a blank Danish model)
+        batch_size: number of texts per tokenizer batch
+        n_process: number of processes to tokenize with (texts are split in n_process shards)
+        executor: pool from worker_pool to tokenize the shards in (defaults to None i.e., a pool is started for this call).
+            The workers tokenize with a blank model of nlp.lang.
+
+    Returns
+        starts, ends: int32 arrays with the start and end offset of every token (of all texts, in order)
+        indptr: int32 array of length len(texts) + 1, the tokens of text i are starts[indptr[i]:indptr[i+1]]
     '''
-    all_tokens = []
+    if nlp is None:
+        print("Loading blank spaCy model...")
+        nlp = spacy.blank("da")
 
-    for i in range(len(df)):
-        # get doc object
-        doc = df['doc'][i]
+    if n_process > 1 and len(texts) > 1:
+        shards = [shard.tolist() for shard in np.array_split(np.array(texts, dtype=object), n_process)]
 
-        # create tokens
-        tokens = [{"id": idx, "start": token.idx, "end": token.idx + len(token.text)} for idx, token in enumerate(doc)]
+        with worker_pool(n_process, lang=nlp.lang) if executor is None else nullcontext(executor) as pool:
+            results = list(pool.map(_offsets_shard, shards, [batch_size] * len(shards)))
+    else:
+        results = [_offsets_batch(texts, nlp.tokenizer, batch_size=batch_size)]
 
-        # append to list
-        all_tokens.append(tokens)
+    starts = np.concatenate([result[0] for result in results])
+    ends = np.concatenate([result[1] for result in results])
+    indptr = np.concatenate([[0], np.cumsum(np.concatenate([result[2] for result in results]))]).astype(np.int32)
 
-    # add to dataframe
-    df['tokens'] = all_tokens
+    return starts, ends, indptr
+
+def create_sents(df, textcol="sentences"):
+    '''
+    Create sents column for dataframe with a text column (one sentence spanning the whole text)
+    '''
+    df['sents'] = [[{"start": 0, "end": len(text)}] for text in df[textcol].tolist()]
 
     return df
 
-def remove_context(df):
+def create_tokens(df, starts, ends, indptr):
     '''
-    Removes context from the entities column that is within {}
+    Create tokens column for dataframe from token offsets (see token_offsets)
     '''
+    starts, ends = starts.tolist(), ends.tolist()
 
-    # remove curly brackets and their contents in entities column and white space infront of it
-    df['entities'] = df['entities'].str.replace(r'\s*{.*}\s*', '', regex=True)
+    df['tokens'] = [
+        [{"id": idx, "start": start, "end": end} for idx, (start, end) in enumerate(zip(starts[i:j], ends[i:j]))]
+        for i, j in zip(indptr[:-1].tolist(), indptr[1:].tolist())
+    ]
 
-    return df  
+    return df
 
-def create_entity_dict(df):
+def create_entity_records(df):
     '''
-    Changes the formatting of entity lists from strings to a list of dictionaries.
+    Parse the formatted entity lists in the entities column (e.g., "['EVENT: 11. september {terror attack}', 'GPE: Berlin']")
+    into lists of entity records with label, entity and context (see records.py).
     '''
-    
-    # make into a list of dictionaries for each entity pair.
-    df['entities_dict'] = df['entities'].apply(lambda x: [{'ent': item.split(': ')[1], 'label': item.split(': ')[0]} for item in eval(x)])
+    df['entities'] = [parse_entities(text) for text in df['entities'].tolist()]
 
     return df
 
 def create_ents(df):
     '''
-    Create ents column for a dataframe with a spacy doc column. It goes through a lot of checks with various regex patterns in order to ensure that ents are correct.
-    '''
-    all_ents = []  
-
-    for i, row in df.iterrows():
-        ents_dict_list = row['entities_dict']  # get dict
-
-        # skip row if entities_dict is empty
-        if not ents_dict_list:
-            all_ents.append([])
-            continue
-
-        ents_in_row = [] 
-
-        for ents_dict in ents_dict_list:
-            ent = ents_dict['ent']  # get text
-            label = ents_dict['label']  # get label
-            end_subtract = 0
-
-            if label == "PERCENT" and "%" in ent:
-                pattern = re.escape(ent) + r'(?!\w)'
-            elif label == "ORDINAL" and ent.endswith("."):
-                pattern = re.escape(ent) + r'.'
-                end_subtract = 1
-            elif label == "MONEY" and ent.endswith("."):
-                pattern = re.escape(ent) + r'(?!\w)'
-            # if the label is money and has a special character (e.g. $), add a backslash before the special character
-            elif label == "MONEY" and re.search(r'[^a-zA-Z0-9\s]', ent):
-                pattern = re.escape(ent) + r'(?!\w)'
-            elif label == "PERSON" and ent.endswith("."):
-                pattern = re.escape(ent) + r'(?!\w)'
-            # if ent starts with @, add a backslash before the @
-            elif ent.startswith("@"):
-                pattern = re.escape(ent) + r'(?!\w)'
-            # if ent has a parenthesis, add a backslash before the parenthesis
-            elif "(" in ent or ")" in ent:
-                pattern = re.escape(ent) + r'(?!\w)'
-            elif label == "LAW":
-                pattern = re.escape(ent) + r'(?!\w)'
-            # if ent contains a +, add a backslash before the +  OR contains a ' e.g., '23, add a backslash before the '
-            elif "+" in ent or "'" in ent:
-                pattern = re.escape(ent) + r'(?!\w)'
-            elif label == "CARDINAL":
-                pattern = r'\b' + re.escape(ent) + r'(?!\w)'
-            else:  # general case
-                pattern = r'\b' + re.escape(ent) + r'(?!\w)'
-
-            # search for the pattern in the sentence, ignoring case
-            for match in re.finditer(pattern, row['sentences'], re.UNICODE):
-                # get start and end of match
-                start, end = match.span()        
-
-                if (row['sentences'][start-1:start] in ['"', "'"]) and (row['sentences'][end:end+1] in ['"', "'"]):
-                # exclude the quotes from the span
-                    start = start - 1
-                    end = end + 1
-                
-                # add span
-                ent_dict = {"start": start, "end": end - end_subtract, "label": label}
-                ents_in_row.append(ent_dict)
-
-        if not ents_in_row:
-            # search now but ignore case
-            for match in re.finditer(pattern, row['sentences'], re.IGNORECASE):
-                # get start and end of match
-                start, end = match.span()        
-
-                if (row['sentences'][start-1:start] in ['"', "'"]) and (row['sentences'][end:end+1] in ['"', "'"]):
-                # exclude the quotes from the span
-                    start = start - 1
-                    end = end + 1
-                
-                # add span
-                ent_dict = {"start": start, "end": end - end_subtract, "label": label}
-                ents_in_row.append(ent_dict)
-        
-        elif not ents_in_row:
-            print(f"No ents found in row: {row['sentences']} with entities: {ent}")
-
-        all_ents.append(ents_in_row)  # Add entities of the current row to the main list
-
-    df['ents'] = all_ents  # Add entities column to the dataframe
+    Create ents column for a dataframe with sentences and entities columns.
+
+    All entities of the df are located with one automaton (see entity_matcher.py), which applies the boundary rules of each label
+    (e.g., PERCENT with %, ORDINAL with a trailing dot, MONEY with symbols) and includes quotes around an entity in its span.
+    If no entities are found in a sentence, its entities are searched for again ignoring case.
+    '''
+    entity_lists = df['entities'].tolist()
+    matcher = EntityMatcher(entity_lists)
+
+    df['ents'] = [matcher.match(sentence, ents) for sentence, ents in zip(df['sentences'].tolist(), entity_lists)]
 
     return df
 
 def remove_cardinal_en(df):
     '''
-    Remove all cardinal numbers that are "en" from the dataframe but without removing the entire row
+    Remove all cardinal numbers that are "en" from the entities column but without removing the entire row
     '''
-    for i, row in df.iterrows():
-        # get ents
-        ents = row['entities_dict']
-
-        # loop through all ents
-        for ent in ents:
-            # get label
-            label = ent['label']
-            text = ent['ent']
+    df['entities'] = [[ent for ent in ents if not (ent['label'] == "CARDINAL" and ent['entity'] == "en")] for ents in df['entities'].tolist()]
 
-            # check if label is cardinal and text is "en"
-            if label == "CARDINAL" and text == "en":
-                # remove from ents
-                ents.remove(ent)
-    
     return df
 
-def label_pipeline(df):
+def label_pipeline(df, nlp=None, n_process=1, executor=None):
     '''
     Pipeline for labeling NER data as SpaCy Span
-    ''' 
-    # remove context from ents
-    df = remove_context(df)
 
-    # create entity dict
-    df = create_entity_dict(df)
+    Args
+        df: dataframe with sentences and entities columns
+        nlp: spacy pipeline to tokenize with (defaults to None i.e., load a blank Danish model)
+        n_process: number of processes to tokenize with
+        executor: pool from worker_pool to tokenize in (see token_offsets)
+    ''' 
+    # parse entity lists into records
+    df = create_entity_records(df)
 
     # remove cardinal numbers that are "en"
     df = remove_cardinal_en(df)
 
-    # convert sentences to doc objects
-    df = convert_to_doc(df)
+    # tokenize sentences
+    starts, ends, indptr = token_offsets(df['sentences'].tolist(), nlp=nlp, n_process=n_process, executor=executor)
 
     # create sents
     df = create_sents(df)
 
     # create tokens
-    df = create_tokens(df)
+    df = create_tokens(df, starts, ends, indptr)
 
     # create ents
     df = create_ents(df)
 
     return df
 
+def label_arrays(df, nlp=None, n_process=1, executor=None):
+    '''
+    Label a dataframe as label_pipeline does, but keep the spans as SpanArrays (see records.py) instead of lists of dicts.
+
+    Returns
+        texts: list of texts
+        entities: list of entity lists
+        spans: dict with SpanArrays for tokens, sents and ents
+    '''
+    # parse entity lists into records and remove cardinal numbers that are "en"
+    df = remove_cardinal_en(create_entity_records(df))
+
+    texts = df['sentences'].tolist()
+
+    # tokenize sentences
+    tokens = SpanArrays(*token_offsets(texts, nlp=nlp, n_process=n_process, executor=executor))
+
+    # one sentence spanning the whole text
+    sents = SpanArrays(np.zeros(len(texts), dtype=np.int32), [len(text) for text in texts], np.arange(len(texts) + 1))
+
+    # create ents
+    ents = SpanArrays.from_dicts(create_ents(df)['ents'].tolist(), with_labels=True)
+
+    return texts, df['entities'].tolist(), {"tokens": tokens, "sents": sents, "ents": ents}
+
+def read_sheet_chunks(path, sheet_names, chunk_size=5000):
+    '''
+    Read sheets of an Excel file in chunks of rows (with openpyxl in read-only mode, so the file is never loaded as a whole).
+
+    Args
+        path: path to the Excel file
+        sheet_names: sheets to read (one after another)
+        chunk_size: number of rows per chunk
+
+    Yields
+        chunk: dataframe with up to chunk_size rows (with the header of the sheet as columns)
+    '''
+    workbook = load_workbook(path, read_only=True, data_only=True)
+
+    try:
+        for sheet_name in sheet_names:
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            header = next(rows)
+            chunk = []
+
+            for row in rows:
+                # skip empty rows
+                if all(value is None for value in row):
+                    continue
+
+                chunk.append(row)
+
+                if len(chunk) == chunk_size:
+                    yield pd.DataFrame(chunk, columns=header)
+                    chunk = []
+
+            if chunk:
+                yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+def create_records(df):
+    '''
+    Create one record per labelled generation with its text, entities and labels (sents, tokens and ents), see records.py.
+    '''
+    columns = [df[column].tolist() for column in ["sentences", "entities", "sents", "tokens", "ents"]]
+
+    return [{"text": text, "entities": entities, "sents": sents, "tokens": tokens, "ents": ents} for text, entities, sents, tokens, ents in zip(*columns)]
+
+def label_chunk(df, nlp=None, arrays=False, n_process=1, executor=None):
+    '''
+    Label a dataframe as records (see create_records) or, if arrays is True, as texts, entities and SpanArrays (see label_arrays).
+    '''
+    if arrays:
+        return label_arrays(df, nlp=nlp, n_process=n_process, executor=executor)
+
+    return create_records(label_pipeline(df, nlp=nlp, n_process=n_process, executor=executor))
+
+def _label_shard(df, arrays=False):
+    '''
+    Label a block of rows in a worker process with the model loaded by init_worker (see label_chunk).
+    '''
+    return label_chunk(df, nlp=_worker_nlp, arrays=arrays)
+
+def label_sharded(df, executor, n_shards, arrays=False):
+    '''
+    Label a dataframe in a pool of processes by splitting it into n_shards blocks of consecutive rows.
+
+    Rows are labelled independently of each other, so the blocks are put back together in order and the output is the same as label_chunk's.
+
+    Args
+        df: dataframe with sentences and entities columns
+        executor: pool from worker_pool to label the blocks in (every worker tokenizes with its own model, so only the blocks are sent)
+        n_shards: number of blocks
+        arrays: whether to return SpanArrays instead of records
+
+    Returns
+        records (or texts, entities and spans) as returned by label_chunk
+    '''
+    blocks = [df.iloc[rows].reset_index(drop=True) for rows in np.array_split(np.arange(len(df)), n_shards) if len(rows)]
+
+    # empty dataframe (no blocks to label)
+    if not blocks:
+        if not arrays:
+            return []
+
+        return [], [], {field: SpanArrays([], [], [0], labels=[] if field == "ents" else None) for field in SPAN_FIELDS}
+
+    results = list(executor.map(_label_shard, blocks, [arrays] * len(blocks)))
+
+    if not arrays:
+        return [record for records in results for record in records]
+
+    texts = [text for result in results for text in result[0]]
+    entities = [ents for result in results for ents in result[1]]
+    spans = {field: SpanArrays.concat([result[2][field] for result in results]) for field in SPAN_FIELDS}
+
+    return texts, entities, spans
+
+def label_streaming(path, outfile, sheet_names=["ENTS", "NO ENTS"], chunk_size=5000, n_process=1, n_workers=1):
+    '''
+    Label generations chunk by chunk and append every labelled chunk to outfile before reading the next, so memory does not grow with the number of generations.
+    The spans are written as records to a .jsonl outfile or as compact arrays to a .parquet outfile (see records.py).
+
+    With n_workers > 1, every chunk is split into n_workers blocks that are labelled in a pool of processes (see label_sharded).
+    Otherwise, with n_process > 1, the chunks are tokenized in one pool of n_process processes that is kept for the whole run.
+
+    Returns
+        n_rows: number of labelled rows
+    '''
+    print("Loading blank spaCy model...")
+    nlp = spacy.blank("da")
+
+    arrays = outfile.suffix == ".parquet"
+    n_rows = 0
+
+    # pools are started once and reused for every chunk
+    tokenizer_pool = worker_pool(n_process) if n_process > 1 and n_workers == 1 else nullcontext()
+
+    with CorpusWriter(outfile) if arrays else nullcontext() as writer, worker_pool(n_workers) if n_workers > 1 else nullcontext() as executor, tokenizer_pool as tokenizer_executor:
+        for chunk in read_sheet_chunks(path, sheet_names, chunk_size=chunk_size):
+            if executor is not None:
+                labelled = label_sharded(chunk, executor, n_workers, arrays=arrays)
+            else:
+                labelled = label_chunk(chunk, nlp=nlp, arrays=arrays, n_process=n_process, executor=tokenizer_executor)
+
+            # write spans as compact arrays to a parquet corpus, or overwrite outfile with the records of the first chunk and append the rest
+            if arrays:
+                writer.write(*labelled)
+            else:
+                write_records(labelled, outfile, append=n_rows > 0)
+
+            n_rows += len(labelled[0]) if arrays else len(labelled)
+
+    return n_rows
+
+def input_parse():
+    '''
+    Parse command line arguments.
+    '''
+    parser = argparse.ArgumentParser(description="Label the generations with spans of their entities.")
+    parser.add_argument("--chunk_size", type=int, default=5000, help="number of generations labelled at a time")
+    parser.add_argument("--in_memory", action="store_true", help="load and label all generations at once instead of in chunks")
+    parser.add_argument("--n_process", type=int, default=1, help="number of processes to tokenize with")
+    parser.add_argument("--n_workers", type=int, default=1, help="number of processes to label blocks of generations in (1 runs without sharding)")
+    parser.add_argument("--format", default="jsonl", choices=["jsonl", "parquet"], help="write records (jsonl) or a corpus with compact span arrays (parquet)")
+
+    return parser.parse_args()
+
 def main(): 
+    args = input_parse()
+
     # define paths
     path = pathlib.Path(__file__)
     data_path = path.parents[1] / "dbase" / "annotations"
+    outfile = data_path / f"annotations_w_generations_spanned.{args.format}"
+
+    if not args.in_memory:
+        n_rows = label_streaming(data_path / "annotations_w_generations.xlsx", outfile, chunk_size=args.chunk_size, n_process=args.n_process, n_workers=args.n_workers)
+        print(f"Labelled {n_rows} generations.")
+        return
 
     # load data
     df_ents = pd.read_excel(data_path / "annotations_w_generations.xlsx", sheet_name="ENTS")
@@ -229,17 +362,18 @@ def main():
     # reset index
     df.reset_index(inplace=True)
 
-    # label data
-    df = label_pipeline(df)
-
-    # remove doc column from dataframe
-    df = df.drop(columns=["doc", "checked", "changed?", "entities", "index", "type", "entities_dict"])
-
-    # rename "sentences" column to "text"
-    df = df.rename(columns={"sentences": "text"})
+    # label data and save spanned generations (e.g., now we have a dataset with text, entities, sents, tokens and ents with spans)
+    if args.n_workers > 1:
+        with worker_pool(args.n_workers) as executor:
+            labelled = label_sharded(df, executor, args.n_workers, arrays=args.format == "parquet")
+    else:
+        labelled = label_chunk(df, arrays=args.format == "parquet", n_process=args.n_process)
 
-    # save spanned generations (e.g., now we have a dataset with text, ents, sents, tokens with spans)
-    df.to_csv(data_path / "annotations_w_generations_spanned.csv", index=False)
+    if args.format == "parquet":
+        with CorpusWriter(outfile) as writer:
+            writer.write(*labelled)
+    else:
+        write_records(labelled, outfile)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,272 @@
+'''
+Typed records of the labelled generations, passed from prepare_data.py to split_data.py as JSONL.
+
+Every record is one generation:
+    {"text": ..., "entities": [{"label": ..., "entity": ..., "context": ...}], "sents": [{"start": ..., "end": ...}],
+     "tokens": [{"id": ..., "start": ..., "end": ...}], "ents": [{"start": ..., "end": ..., "label": ...}]}
+
+The entities have the same fields as in the annotation lists (see annotations/writers.py). The entity lists of the generations workbook
+(formatted as in annotations.xlsx, e.g. "['EVENT: 11. september {terror attack}', 'GPE: Berlin']") are parsed once when they are read.
+
+For large corpora, the spans can instead be kept as SpanArrays (flat int32 start and end offsets of all documents with an index pointer,
+plus label ids for ents) and stored in Parquet with CorpusWriter (one list<int32> column per offset array, so the file holds the same flat
+arrays). read_corpus reads the file into one flat array per column (the row groups of a streamed corpus are concatenated
+once, which copies them) and indexing the SpanArrays returns numpy views of a document.
+'''
+import ast
+import json
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# labels of the ents (label ids are the positions in this list)
+LABELS = ["EVENT", "FACILITY", "GPE", "LANGUAGE", "LAW", "LOCATION", "NORP", "ORDINAL", "ORGANIZATION", "PRODUCT", "TIME", "WORK OF ART", "CARDINAL", "DATE", "MONEY", "PERCENT", "QUANTITY", "PERSON"]
+
+# span fields of a record (ents also have a label)
+SPAN_FIELDS = ["tokens", "sents", "ents"]
+
+# schema of the Parquet corpus
+ENTITY_TYPE = pa.struct([("label", pa.string()), ("entity", pa.string()), ("context", pa.string())])
+CORPUS_SCHEMA = pa.schema(
+    [("text", pa.string()), ("entities", pa.list_(ENTITY_TYPE))]
+    + [(f"{field}_{part}", pa.list_(pa.int32())) for field in SPAN_FIELDS for part in ["start", "end"]]
+    + [("ents_label", pa.list_(pa.int8()))]
+).with_metadata({"labels": json.dumps(LABELS)})
+
+def parse_entity(item):
+    '''
+    Parse a formatted entity (e.g., "EVENT: 11. september {terror attack}") into a dict with label, entity and context (None if it has none).
+    '''
+    label, entity = item.split(": ", 1)
+    context = None
+
+    # context is within {} at the end of the entity
+    if entity.endswith("}") and "{" in entity:
+        entity, context = entity[:-1].rsplit("{", 1)
+        entity = entity.rstrip()
+
+    return {"label": label, "entity": entity, "context": context}
+
+def parse_entities(text):
+    '''
+    Parse a formatted entity list (e.g., "['PERSON: Nina Bang', 'GPE: Berlin']") into a list of entity dicts.
+
+    The list is read with ast.literal_eval, so only a literal list of strings is accepted.
+    '''
+    items = ast.literal_eval(text)
+
+    if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+        raise ValueError(f"Not a list of formatted entities: {text!r}")
+
+    return [parse_entity(item) for item in items]
+
+def write_records(records, path, append=False):
+    '''
+    Write records to a JSONL file (one record per line).
+
+    Args
+        records: list of dicts
+        path: path to the .jsonl file
+        append: whether to append to the file instead of overwriting it
+    '''
+    with open(path, "a" if append else "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def read_records(path):
+    '''
+    Read records from a JSONL file.
+    '''
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+class SpanArrays:
+    '''
+    Spans of many documents as flat arrays. The spans of document i are starts[indptr[i]:indptr[i+1]] (and ends, labels).
+
+    Args
+        starts, ends: int32 arrays with the start and end offset of every span
+        indptr: array of length n_docs + 1 with the position of the first span of every document
+        labels: int8 array with the label id (position in LABELS) of every span (defaults to None i.e., spans without labels)
+    '''
+    def __init__(self, starts, ends, indptr, labels=None):
+        self.starts = np.asarray(starts, dtype=np.int32)
+        self.ends = np.asarray(ends, dtype=np.int32)
+        self.indptr = np.asarray(indptr)
+        self.labels = None if labels is None else np.asarray(labels, dtype=np.int8)
+
+    @classmethod
+    def from_dicts(cls, span_lists, with_labels=False):
+        '''
+        Create SpanArrays from lists of {"start": ..., "end": ..., "label": ...} dicts (one list per document).
+        '''
+        spans = [span for span_list in span_lists for span in span_list]
+        indptr = np.zeros(len(span_lists) + 1, dtype=np.int64)
+        np.cumsum([len(span_list) for span_list in span_lists], out=indptr[1:])
+
+        label_ids = {label: i for i, label in enumerate(LABELS)}
+        labels = [label_ids[span["label"]] for span in spans] if with_labels else None
+
+        return cls([span["start"] for span in spans], [span["end"] for span in spans], indptr, labels)
+
+    @classmethod
+    def from_arrow(cls, starts, ends, labels=None):
+        '''
+        Create SpanArrays from list<int32> columns of a table. Columns with several chunks (e.g., row groups) are concatenated first, which copies them.
+        '''
+        arrays = [column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column for column in [starts, ends, labels] if column is not None]
+
+        # offsets of a sliced list array do not start at 0
+        offsets = arrays[0].offsets.to_numpy()
+        values = [array.values.to_numpy()[offsets[0]:offsets[-1]] for array in arrays]
+
+        return cls(values[0], values[1], offsets - offsets[0], values[2] if labels is not None else None)
+
+    @classmethod
+    def concat(cls, span_arrays):
+        '''
+        Concatenate SpanArrays of consecutive blocks of documents (in order).
+        '''
+        offsets = np.cumsum([0] + [len(spans.starts) for spans in span_arrays])
+        indptr = np.concatenate([[0]] + [spans.indptr[1:] + offset for spans, offset in zip(span_arrays, offsets)])
+        labels = None if span_arrays[0].labels is None else np.concatenate([spans.labels for spans in span_arrays])
+
+        return cls(np.concatenate([spans.starts for spans in span_arrays]), np.concatenate([spans.ends for spans in span_arrays]), indptr, labels)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, i):
+        '''
+        Views of the starts and ends (and labels) of document i.
+        '''
+        doc = slice(self.indptr[i], self.indptr[i + 1])
+
+        if self.labels is None:
+            return self.starts[doc], self.ends[doc]
+
+        return self.starts[doc], self.ends[doc], self.labels[doc]
+
+    def to_dicts(self, i, field):
+        '''
+        Spans of document i as dicts in the format of the JSONL records (field is "tokens", "sents" or "ents").
+        '''
+        spans = self[i]
+
+        if field == "tokens":
+            return [{"id": idx, "start": start, "end": end} for idx, (start, end) in enumerate(zip(spans[0].tolist(), spans[1].tolist()))]
+        elif field == "ents":
+            return [{"start": start, "end": end, "label": LABELS[label]} for start, end, label in zip(spans[0].tolist(), spans[1].tolist(), spans[2].tolist())]
+
+        return [{"start": start, "end": end} for start, end in zip(spans[0].tolist(), spans[1].tolist())]
+
+    def to_arrow(self):
+        '''
+        Convert to list<int32> (and list<int8> for labels) arrays.
+        '''
+        offsets = pa.array(self.indptr, type=pa.int32())
+        arrays = [pa.ListArray.from_arrays(offsets, pa.array(self.starts)), pa.ListArray.from_arrays(offsets, pa.array(self.ends))]
+
+        if self.labels is not None:
+            arrays.append(pa.ListArray.from_arrays(offsets, pa.array(self.labels)))
+
+        return arrays
+
+class CorpusWriter:
+    '''
+    Write labelled documents in chunks to a Parquet corpus (one row group per chunk). The file is replaced when the writer is closed.
+
+    Args
+        path: path to the .parquet file
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path.with_name(path.name + ".tmp")
+        self.writer = pq.ParquetWriter(self.tmp_path, CORPUS_SCHEMA)
+        self.n_written = 0
+
+    def write(self, texts, entities, spans):
+        '''
+        Write a chunk of documents.
+
+        Args
+            texts: list of texts
+            entities: list of entity lists (see parse_entities)
+            spans: dict with SpanArrays for "tokens", "sents" and "ents" (the latter with labels)
+        '''
+        columns = [pa.array(texts, type=pa.string()), pa.array(entities, type=CORPUS_SCHEMA.field("entities").type)]
+
+        for field in SPAN_FIELDS:
+            columns.extend(spans[field].to_arrow())
+
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=CORPUS_SCHEMA))
+        self.n_written += len(texts)
+
+    def close(self):
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # keep the previous corpus if an error occurred
+        if exc_type is None:
+            self.close()
+        else:
+            self.writer.close()
+            os.remove(self.tmp_path)
+
+class Corpus:
+    '''
+    Labelled documents read from a Parquet corpus, with texts, entities and SpanArrays for tokens, sents and ents.
+    '''
+    def __init__(self, table):
+        labels = json.loads(table.schema.metadata[b"labels"])
+
+        if labels != LABELS:
+            raise ValueError(f"Corpus was written with labels {labels}, expected {LABELS}")
+
+        self.table = table
+        self.tokens = SpanArrays.from_arrow(table.column("tokens_start"), table.column("tokens_end"))
+        self.sents = SpanArrays.from_arrow(table.column("sents_start"), table.column("sents_end"))
+        self.ents = SpanArrays.from_arrow(table.column("ents_start"), table.column("ents_end"), table.column("ents_label"))
+
+    def __len__(self):
+        return self.table.num_rows
+
+    @property
+    def texts(self):
+        return self.table.column("text").to_pylist()
+
+    def to_records(self):
+        '''
+        Convert to records in the format of the JSONL records.
+        '''
+        return [
+            {"text": text, "entities": entities, "sents": self.sents.to_dicts(i, "sents"), "tokens": self.tokens.to_dicts(i, "tokens"), "ents": self.ents.to_dicts(i, "ents")}
+            for i, (text, entities) in enumerate(zip(self.texts, self.table.column("entities").to_pylist()))
+        ]
+
+def read_corpus(path, columns=None):
+    '''
+    Read a Parquet corpus (memory-mapped).
+
+    Args
+        path: path to the .parquet file
+        columns: columns to read (defaults to all, the span columns are always read)
+    '''
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + [name for name in CORPUS_SCHEMA.names if name.split("_")[0] in SPAN_FIELDS]))
+
+    return Corpus(pq.read_table(path, columns=columns, memory_map=True))
+
+def read_labelled(path):
+    '''
+    Read labelled documents as records from a .jsonl file or a .parquet corpus.
+    '''
+    if path.suffix == ".parquet":
+        return read_corpus(path).to_records()
+
+    return read_records(path)
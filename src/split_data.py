@@ -1,15 +1,17 @@
 '''
-Split annotations_w_generations_spanned into train, dev, test. Convert to .spacy formats for model development.
+Split annotations_w_generations_spanned (records from prepare_data.py) into train, dev, test. Convert to .spacy formats for model development.
 '''
 
+import argparse
 import pathlib
 import spacy 
 import pandas as pd
 from spacy.tokens import DocBin
-import ast
 from sklearn.model_selection import train_test_split
 import numpy as np
 
+from records import read_records, read_corpus, LABELS
+
 def format_text(df): 
     '''
     Changing formatting of the text (15% uppercase, 15% lowercase, 70% same).
@@ -53,13 +55,26 @@ def create_splits(df, train_size=0.8, dev_size=0.1, test_size=0.1, random_state=
 
     return train_df, dev_df, test_df
 
-def convert_to_spacy(df, save_path=None):
+def row_ents(row, ents=None):
+    '''
+    Get the (start, end, label) of every entity of a row, from its ents column or, if ents is given, from the SpanArrays of the corpus
+    (at the position in the doc column of the row).
+    '''
+    if ents is None:
+        return [(ent['start'], ent['end'], ent['label']) for ent in row['ents']]
+
+    starts, ends, labels = ents[row['doc']]
+
+    return [(start, end, LABELS[label]) for start, end, label in zip(starts.tolist(), ends.tolist(), labels.tolist())]
+
+def convert_to_spacy(df, save_path=None, ents=None):
     '''
     Convert dataframe to spacy format. Inspired by https://spacy.io/usage/training#training-data
 
     Args
-        df: dataframe with ents column
+        df: dataframe with text and ents columns (or text and doc columns if ents is given)
         save_path: path to save spacy docbin object (defaults to None i.e., no saving)
+        ents: SpanArrays with the ents of a corpus (defaults to None i.e., use the ents column)
     
     Returns
         db: spacy docbin object
@@ -77,10 +92,7 @@ def convert_to_spacy(df, save_path=None):
         # access dictionary within list in row['ents']
         spans = []
 
-        for ent in row['ents']:
-            # get start, end and label
-            start, end, label = ent.values()
-
+        for start, end, label in row_ents(row, ents):
             # check if ent is at the end of a doc or if it is a money, quantity, ordinal or law entity (these often have annotation problems)
             if end+2 >= len(doc.text) or label in ["MONEY", "QUANTITY", "ORDINAL", "LAW"]:
                 alignment_mode = "expand"
@@ -104,22 +116,17 @@ def convert_to_spacy(df, save_path=None):
 
     return db
 
-def distributions_labels(df):
+def distributions_labels(df, ents=None):
     '''
-    Return distribution of labels in ents dict from dataframe 
+    Return distribution of labels in ents dict from dataframe (or from the SpanArrays of a corpus, see row_ents)
     '''
     # create empty dict
     labels = {}
 
     # loop through all rows
     for i, row in df.iterrows():
-        # get ents
-        ents = row['ents']
-
         # loop through all ents
-        for ent in ents:
-            # get label
-            label = ent['label']
+        for _, _, label in row_ents(row, ents):
 
             # add to dict
             if label in labels.keys():
@@ -129,7 +136,7 @@ def distributions_labels(df):
         
     return labels
 
-def save_label_distributions(df_dict, distribution_all, save_path):
+def save_label_distributions(df_dict, distribution_all, save_path, ents=None):
     '''
     Takes a dict of dataframes (train, dev and test) with their name (key) and the dataframe (value). Saves label distributions to txt
     '''
@@ -149,7 +156,7 @@ def save_label_distributions(df_dict, distribution_all, save_path):
     # iterate over dfs
     for i, df in enumerate(df_list):
         # get label distributions
-        labels = distributions_labels(df)
+        labels = distributions_labels(df, ents)
 
         # order according to value
         labels = {k: v for k, v in sorted(labels.items(), key=lambda item: item[1], reverse=True)}
@@ -160,19 +167,33 @@ def save_label_distributions(df_dict, distribution_all, save_path):
 
     return None
 
+def input_parse():
+    '''
+    Parse command line arguments.
+    '''
+    parser = argparse.ArgumentParser(description="Split the labelled generations into train, dev and test and convert them to .spacy.")
+    parser.add_argument("--format", default="jsonl", choices=["jsonl", "parquet"], help="format of the labelled generations (see prepare_data.py)")
+
+    return parser.parse_args()
+
 def main(): 
+    args = input_parse()
+
     # define paths 
     path = pathlib.Path(__file__)
     data_path = path.parents[1] / "dbase" / "annotations"
 
-    # load data
-    df = pd.read_csv(data_path / "annotations_w_generations_spanned.csv")
-
-    # convert entities dict into a dict again within col
-    df['ents'] = df['ents'].apply(ast.literal_eval)
+    # load data (ents are lists of dicts in the records, or SpanArrays of the corpus that the doc column points into)
+    if args.format == "parquet":
+        corpus = read_corpus(data_path / "annotations_w_generations_spanned.parquet", columns=["text"])
+        df = pd.DataFrame({"text": corpus.texts, "doc": np.arange(len(corpus))})
+        ents = corpus.ents
+    else:
+        df = pd.DataFrame(read_records(data_path / "annotations_w_generations_spanned.jsonl"))
+        ents = None
 
     # print distribution of labels
-    distribution_all = distributions_labels(df)
+    distribution_all = distributions_labels(df, ents)
 
     # create splits
     train_df, dev_df, test_df = create_splits(df)
@@ -187,15 +208,15 @@ def main():
     print(f"Test length: {len(test_df)}")
 
     # save label distributions
-    save_label_distributions({"train": train_df, "dev": dev_df, "test": test_df}, distribution_all, data_path / "label_distributions.txt")
+    save_label_distributions({"train": train_df, "dev": dev_df, "test": test_df}, distribution_all, data_path / "label_distributions.txt", ents=ents)
 
     # convert all to spacy format
     spacy_path = path.parents[1] / "data" 
     spacy_path.mkdir(parents=True, exist_ok=True)
 
-    train_db = convert_to_spacy(train_df, save_path = spacy_path/ "train" / "SYNEDA_train.spacy")
-    dev_db = convert_to_spacy(dev_df, save_path = spacy_path/ "dev" / "SYNEDA_dev.spacy")
-    test_db = convert_to_spacy(test_df, save_path = spacy_path/ "test" / "SYNEDA_test.spacy")
+    train_db = convert_to_spacy(train_df, save_path = spacy_path/ "train" / "SYNEDA_train.spacy", ents=ents)
+    dev_db = convert_to_spacy(dev_df, save_path = spacy_path/ "dev" / "SYNEDA_dev.spacy", ents=ents)
+    test_db = convert_to_spacy(test_df, save_path = spacy_path/ "test" / "SYNEDA_test.spacy", ents=ents)
 
 
 if __name__ == "__main__":